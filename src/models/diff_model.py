@@ -3,11 +3,38 @@
 
 定义比较结果的数据结构。
 """
+import sys
 from dataclasses import dataclass
+from functools import lru_cache
 from typing import Any, Optional, List
 from enum import Enum
 
 
+# Python 3.10+ 支持 slots 数据类，差异结果数量大时可减少内存和构造开销
+_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+
+@lru_cache(maxsize=16384)
+def col_to_letter(col: int) -> str:
+    """将列索引转换为字母（0=A, 1=B, ..., 26=AA），结果缓存复用"""
+    result = ""
+    while col >= 0:
+        result = chr(col % 26 + ord('A')) + result
+        col = col // 26 - 1
+    return result
+
+
+def letter_to_col(letters: str) -> int:
+    """将列字母转换为列索引（A=0, B=1, ..., AA=26），非法输入抛出 ValueError"""
+    letters = letters.strip().upper()
+    if not (letters.isascii() and letters.isalpha()):
+        raise ValueError(f"无效的列名: {letters}")
+    n = 0
+    for b in letters.encode('ascii'):
+        n = n * 26 + (b - 64)
+    return n - 1
+
+
 class DiffType(Enum):
     """差异类型"""
     MODIFIED = "modified"       # 修改
@@ -16,19 +43,19 @@ class DiffType(Enum):
     FORMAT_CHANGED = "format"   # 格式变化
 
 
-@dataclass
+@dataclass(**_SLOTS)
 class DiffResult:
-    """单个差异结果"""
+    """单个差异结果（字段顺序即位置参数顺序，热路径按位置构造）"""
     sheet: str              # 工作表名称
     row: int                # 文件A行号（0-indexed）
     col: int                # 文件A列号（0-indexed）
     diff_type: DiffType     # 差异类型
     old_value: Any = None   # 原值（文件A）
     new_value: Any = None   # 新值（文件B）
-    old_formula: Optional[str] = None
-    new_formula: Optional[str] = None
     row_b: Optional[int] = None  # 文件B行号（主键匹配时可能不同）
     col_b: Optional[int] = None  # 文件B列号（主键匹配时可能不同）
+    old_formula: Optional[str] = None
+    new_formula: Optional[str] = None
     
     @property
     def position(self) -> str:
@@ -39,11 +66,7 @@ class DiffResult:
     @staticmethod
     def _col_to_letter(col: int) -> str:
         """将列索引转换为字母（0=A, 1=B, ...）"""
-        result = ""
-        while col >= 0:
-            result = chr(col % 26 + ord('A')) + result
-            col = col // 26 - 1
-        return result
+        return col_to_letter(col)
     
     @property
     def type_display(self) -> str:
@@ -4,7 +4,7 @@ Excel 数据模型定义
 定义 Excel 文件解析后的统一数据结构。
 """
 from dataclasses import dataclass, field
-from typing import Any, Optional, List, Dict
+from typing import Any, Iterator, Optional, List, Dict
 from enum import Enum
 
 
@@ -61,12 +61,78 @@ class SheetData:
     rows: List[List[CellData]] = field(default_factory=list)
     row_count: int = 0
     col_count: int = 0
+    # 单元格值缓存（row_count x col_count 的二维列表），由 get_values() 按需构建
+    _values: Optional[List[List[Any]]] = field(default=None, init=False, repr=False, compare=False)
+    # 单元格文本缓存（与 _values 同形），由 get_texts() 按需构建
+    _texts: Optional[List[List[str]]] = field(default=None, init=False, repr=False, compare=False)
     
     def get_cell(self, row: int, col: int) -> Optional[CellData]:
         """获取指定位置的单元格"""
         if 0 <= row < len(self.rows) and 0 <= col < len(self.rows[row]):
             return self.rows[row][col]
         return None
+    
+    def get_values(self) -> List[List[Any]]:
+        """
+        获取所有单元格值（二维列表，缺失的单元格补 None）
+        
+        首次调用时一次性构建并缓存，返回的行列表为共享数据，调用方不应修改。
+        """
+        if self._values is None:
+            width = self.col_count
+            values = []
+            for row in self.rows[:self.row_count]:
+                row_values = [cell.value if cell else None for cell in row[:width]]
+                if len(row_values) < width:
+                    row_values.extend([None] * (width - len(row_values)))
+                values.append(row_values)
+            while len(values) < self.row_count:
+                values.append([None] * width)
+            self._values = values
+        return self._values
+    
+    def get_range_values(self, min_row: int, min_col: int, max_row: int, max_col: int) -> List[List[Any]]:
+        """
+        获取矩形区域的单元格值（0-indexed，包含边界，索引不能为负）
+        
+        基于 get_values() 的缓存按行切片，超出工作表范围的单元格补 None。
+        返回的行列表为新建列表，调用方可以修改。
+        """
+        return list(self.iter_range_values(min_row, min_col, max_row, max_col))
+    
+    def iter_range_values(self, min_row: int, min_col: int, max_row: int, max_col: int) -> Iterator[List[Any]]:
+        """
+        逐行生成矩形区域的单元格值，与 get_range_values() 相同但不一次性构建整个区域
+        
+        适合逐行处理的场景（如按位置比较），同一时刻只持有当前行的切片。
+        """
+        values = self.get_values()
+        width = max_col - min_col + 1
+        for row in range(min_row, max_row + 1):
+            if row < len(values):
+                row_values = values[row][min_col:max_col + 1]
+                if len(row_values) < width:
+                    row_values.extend([None] * (width - len(row_values)))
+            else:
+                row_values = [None] * width
+            yield row_values
+    
+    def get_texts(self) -> List[List[str]]:
+        """
+        获取所有单元格的文本（str() 后去除前后空格，空单元格为空字符串）
+        
+        与 get_values() 同形，首次调用时一次性构建并缓存，供主键、标题、空值判断复用。
+        """
+        if self._texts is None:
+            # 字符串单元格最常见，直接 strip，省去 str() 调用
+            self._texts = [
+                [
+                    v.strip() if isinstance(v, str) else ("" if v is None else str(v).strip())
+                    for v in row
+                ]
+                for row in self.get_values()
+            ]
+        return self._texts
 
 
 @dataclass
@@ -76,8 +142,12 @@ class WorkbookData:
     file_name: str
     file_size: int = 0
     modified_time: str = ""
+    # 加载时的文件修改时间（纳秒），用于判断磁盘文件是否已变化
+    mtime_ns: int = 0
     sheets: List[SheetData] = field(default_factory=list)
     sheet_names: List[str] = field(default_factory=list)
+    # 只读取了单元格值（未解析样式和批注），比较格式差异时需要重新完整加载
+    read_only: bool = False
     
     def get_sheet(self, name: str) -> Optional[SheetData]:
         """根据名称获取工作表"""
@@ -3,12 +3,20 @@ Excel 比较服务
 
 提供多种比较模式来比较两个 Excel 文件的差异。
 """
+import heapq
+import logging
+import operator
+import sys
+from collections import defaultdict
+from itertools import chain
 from enum import Enum
-from typing import List, Optional, Set, Tuple
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
 
 from src.models.excel_model import WorkbookData, SheetData, CellData, CellType
 from src.models.diff_model import DiffResult, DiffSummary, DiffType, CompareResult
 
+logger = logging.getLogger(__name__)
+
 
 class CompareMode(Enum):
     """比较模式"""
@@ -33,6 +41,9 @@ class CompareOptions:
 class CompareService:
     """比较服务"""
     
+    # 智能匹配时每处理多少个主键/行回报一次进度
+    PROGRESS_INTERVAL = 1000
+    
     @classmethod
     def compare(
         cls,
@@ -40,7 +51,8 @@ class CompareService:
         workbook_b: WorkbookData,
         mode: CompareMode = CompareMode.EXACT,
         options: Optional[CompareOptions] = None,
-        selected_sheets: Optional[List[str]] = None
+        selected_sheets: Optional[List[str]] = None,
+        progress_cb: Optional[Callable[[int, str], None]] = None
     ) -> CompareResult:
         """
         比较两个工作簿
@@ -51,6 +63,7 @@ class CompareService:
             mode: 比较模式
             options: 比较选项
             selected_sheets: 要比较的工作表列表，None 表示全部
+            progress_cb: 进度回调 (百分比 0-100, 消息)，每开始比较一个工作表回报一次
             
         Returns:
             CompareResult 对象
@@ -71,7 +84,10 @@ class CompareService:
             sheets_to_compare = sheets_a | sheets_b
         
         # 比较每个工作表
-        for sheet_name in sheets_to_compare:
+        sheet_count = len(sheets_to_compare)
+        for sheet_idx, sheet_name in enumerate(sheets_to_compare):
+            if progress_cb:
+                progress_cb(sheet_idx * 100 // sheet_count, f"正在比较工作表 {sheet_name}...")
             sheet_a = workbook_a.get_sheet(sheet_name)
             sheet_b = workbook_b.get_sheet(sheet_name)
             
@@ -111,12 +127,30 @@ class CompareService:
         sheet_b: SheetData, 
         options: CompareOptions
     ) -> List[DiffResult]:
-        """精确匹配比较"""
+        """
+        精确匹配比较
+        
+        忽略格式时，原始值相等的单元格必然无差异：按行取缓存的值网格，整行相同直接跳过，
+        只对原始值不同的列取单元格逐个比较；比较格式时逐单元格比较。
+        """
         diffs = []
+        append = diffs.append
+        compare_cells = cls._compare_cells
+        sheet_name = sheet_a.name
         
         max_rows = max(sheet_a.row_count, sheet_b.row_count)
         max_cols = max(sheet_a.col_count, sheet_b.col_count)
         
+        by_values = options.ignore_format
+        if by_values:
+            values_a = sheet_a.get_values()
+            values_b = sheet_b.get_values()
+            # 两表列数不同时较窄一侧补 None，超出行数的一侧按全空行比较
+            pad_a = [None] * (max_cols - sheet_a.col_count)
+            pad_b = [None] * (max_cols - sheet_b.col_count)
+            empty_row = [None] * max_cols
+        all_cols = range(max_cols)
+        
         for row in range(max_rows):
             # 检查是否需要跳过空行
             if options.ignore_empty_rows:
@@ -125,15 +159,25 @@ class CompareService:
                 if row_a_empty and row_b_empty:
                     continue
             
-            for col in range(max_cols):
-                cell_a = sheet_a.get_cell(row, col)
-                cell_b = sheet_b.get_cell(row, col)
-                
-                diff = cls._compare_cells(
-                    sheet_a.name, row, col, cell_a, cell_b, options
+            if by_values:
+                row_a = values_a[row] if row < len(values_a) else empty_row
+                row_b = values_b[row] if row < len(values_b) else empty_row
+                if pad_a and row_a is not empty_row:
+                    row_a = row_a + pad_a
+                if pad_b and row_b is not empty_row:
+                    row_b = row_b + pad_b
+                if row_a == row_b:
+                    continue
+                cols = [col for col, (val_a, val_b) in enumerate(zip(row_a, row_b)) if val_a != val_b]
+            else:
+                cols = all_cols
+            
+            for col in cols:
+                diff = compare_cells(
+                    sheet_name, row, col, sheet_a.get_cell(row, col), sheet_b.get_cell(row, col), options
                 )
                 if diff:
-                    diffs.append(diff)
+                    append(diff)
         
         return diffs
     
@@ -144,36 +188,46 @@ class CompareService:
         sheet_b: SheetData,
         options: CompareOptions
     ) -> List[DiffResult]:
-        """数值比较（只比较数值类型）"""
+        """
+        数值比较（只比较数值类型）
+        
+        每行先一次性转换为数值列表（不可转换的为 None），整行相同直接跳过，
+        只对数值不同的列构造差异。
+        """
+        DR = DiffResult
+        ADDED = DiffType.ADDED
+        DELETED = DiffType.DELETED
+        MODIFIED = DiffType.MODIFIED
+        to_numeric = cls._to_numeric
+        sheet_name = sheet_a.name
+        
         diffs = []
+        extend = diffs.extend
         
         max_rows = max(sheet_a.row_count, sheet_b.row_count)
         max_cols = max(sheet_a.col_count, sheet_b.col_count)
         
+        def numeric_row(sheet: SheetData, row: int) -> List[Optional[float]]:
+            """一行单元格的数值（与 get_cell 相同，缺失的单元格为 None）"""
+            cells = sheet.rows[row] if row < len(sheet.rows) else []
+            nums = [to_numeric(cell) for cell in cells[:max_cols]]
+            if len(nums) < max_cols:
+                nums.extend([None] * (max_cols - len(nums)))
+            return nums
+        
         for row in range(max_rows):
-            for col in range(max_cols):
-                cell_a = sheet_a.get_cell(row, col)
-                cell_b = sheet_b.get_cell(row, col)
-                
-                # 尝试转换为数值比较
-                val_a = cls._to_numeric(cell_a)
-                val_b = cls._to_numeric(cell_b)
-                
-                if val_a != val_b:
-                    diff_type = DiffType.MODIFIED
-                    if val_a is None and val_b is not None:
-                        diff_type = DiffType.ADDED
-                    elif val_a is not None and val_b is None:
-                        diff_type = DiffType.DELETED
-                    
-                    diffs.append(DiffResult(
-                        sheet=sheet_a.name,
-                        row=row,
-                        col=col,
-                        diff_type=diff_type,
-                        old_value=val_a,
-                        new_value=val_b
-                    ))
+            nums_a = numeric_row(sheet_a, row)
+            nums_b = numeric_row(sheet_b, row)
+            if nums_a == nums_b:
+                continue
+            
+            extend([
+                DR(sheet_name, row, col,
+                   ADDED if val_a is None else (DELETED if val_b is None else MODIFIED),
+                   val_a, val_b)
+                for col, (val_a, val_b) in enumerate(zip(nums_a, nums_b))
+                if val_a != val_b
+            ])
         
         return diffs
     
@@ -412,3 +466,551 @@ class CompareService:
             except (ValueError, TypeError):
                 return None
         return None
+    
+    @classmethod
+    def compare_with_smart_match(
+        cls,
+        workbook_a: WorkbookData,
+        workbook_b: WorkbookData,
+        key_cols_a: Tuple[Optional[int], Optional[int]],
+        key_cols_b: Tuple[Optional[int], Optional[int]],
+        header_row: Optional[int],
+        options: Optional[CompareOptions] = None,
+        selected_sheets: Optional[List[str]] = None,
+        progress_cb: Optional[Callable[[int, str], None]] = None,
+        sheet_cache: Optional[Dict[tuple, List[DiffResult]]] = None
+    ) -> CompareResult:
+        """
+        使用智能匹配方式比较（支持A文件和B文件分别指定主键列）
+        
+        Args:
+            workbook_a: 第一个工作簿
+            workbook_b: 第二个工作簿
+            key_cols_a: A文件主键列 (主键列1, 主键列2)，0-indexed，None 表示未指定
+            key_cols_b: B文件主键列 (主键列1, 主键列2)
+            header_row: 标题行索引（0-indexed），None 表示不按标题匹配列
+            options: 比较选项
+            selected_sheets: 要比较的工作表列表，None 表示全部
+            progress_cb: 进度回调 (百分比 0-100, 消息)
+            sheet_cache: 工作表级结果缓存，按 (工作表, 比较条件) 复用上次结果；
+                调用方负责在任一工作簿重新加载时清空
+            
+        Returns:
+            CompareResult 对象
+        """
+        if options is None:
+            options = CompareOptions()
+        
+        logger.debug(
+            "开始智能匹配比较: A文件主键列=%s, B文件主键列=%s, 标题行=%s",
+            key_cols_a, key_cols_b, header_row
+        )
+
+        # 按工作表分别收集差异，最后再合并
+        diffs_by_sheet = {}
+
+        # 获取要比较的工作表
+        sheets_a = workbook_a.sheet_names
+        sheets_b = workbook_b.sheet_names
+        
+        if selected_sheets:
+            sheets_to_compare = [s for s in selected_sheets if s in sheets_a and s in sheets_b]
+        else:
+            sheets_to_compare = [s for s in sheets_a if s in sheets_b]
+        
+        sheet_span = 100 / len(sheets_to_compare) if sheets_to_compare else 100
+        
+        # 缓存键中的比较条件部分；工作簿内容不在键中，由调用方在重新加载文件时清空缓存
+        cache_key_base = (
+            tuple(key_cols_a), tuple(key_cols_b), header_row,
+            tuple(sorted(vars(options).items()))
+        )
+        
+        # 工作表逐个比较：比较是纯 Python 计算，受 GIL 限制多线程并不能加速，
+        # 且进度回调（CompareWorker 的节流状态）不是线程安全的
+        for sheet_idx, sheet_name in enumerate(sheets_to_compare):
+            sheet_a = workbook_a.get_sheet(sheet_name)
+            sheet_b = workbook_b.get_sheet(sheet_name)
+            
+            if not sheet_a or not sheet_b:
+                continue
+            
+            sheet_progress = sheet_idx * sheet_span
+            if progress_cb:
+                progress_cb(int(sheet_progress), f"正在比较工作表 {sheet_name}...")
+            
+            cache_key = (sheet_name,) + cache_key_base
+            if sheet_cache is not None and cache_key in sheet_cache:
+                logger.debug("工作表 '%s': 使用缓存的比较结果", sheet_name)
+                sheet_diffs = sheet_cache[cache_key]
+            else:
+                sheet_diffs = cls._smart_compare_sheet(
+                    sheet_name, sheet_a, sheet_b, key_cols_a, key_cols_b, header_row,
+                    options, progress_cb, sheet_progress, sheet_span
+                )
+                if sheet_cache is not None:
+                    sheet_cache[cache_key] = sheet_diffs
+            if sheet_diffs:
+                diffs_by_sheet[sheet_name] = sheet_diffs
+        
+        all_diffs = list(chain.from_iterable(diffs_by_sheet.values()))
+
+        # 创建结果
+        summary = DiffSummary()
+        for diff in all_diffs:
+            summary.add_diff(diff.diff_type)
+
+        logger.debug(
+            "智能匹配比较完成，共发现 %d 处差异: 新增=%d, 删除=%d, 修改=%d",
+            len(all_diffs), summary.added, summary.deleted, summary.modified
+        )
+
+        return CompareResult(
+            file_a=workbook_a.file_name,
+            file_b=workbook_b.file_name,
+            diffs=all_diffs,
+            summary=summary,
+            diffs_by_sheet=diffs_by_sheet
+        )
+    
+    @classmethod
+    def _smart_compare_sheet(
+        cls,
+        sheet_name: str,
+        sheet_a: SheetData,
+        sheet_b: SheetData,
+        key_cols_a: Tuple[Optional[int], Optional[int]],
+        key_cols_b: Tuple[Optional[int], Optional[int]],
+        header_row: Optional[int],
+        options: CompareOptions,
+        progress_cb: Optional[Callable[[int, str], None]] = None,
+        sheet_progress: float = 0,
+        sheet_span: float = 100
+    ) -> List[DiffResult]:
+        """
+        智能匹配比较单个工作表
+        
+        Args:
+            sheet_progress: 该工作表开始时的总进度
+            sheet_span: 该工作表占用的进度跨度
+            其余参数同 compare_with_smart_match
+            
+        Returns:
+            该工作表的差异列表
+        """
+        key_col1_a, key_col2_a = key_cols_a
+        key_col1_b, key_col2_b = key_cols_b
+        
+        # 比较时需要跳过的主键列
+        skip_a = frozenset(c for c in key_cols_a if c is not None)
+        skip_b = frozenset(c for c in key_cols_b if c is not None)
+        logger.debug(
+            "工作表 '%s': 比较时跳过的主键列 A=%s, B=%s",
+            sheet_name, sorted(skip_a), sorted(skip_b)
+        )
+        
+        diffs = []
+        
+        # 热路径中频繁使用的名称绑定为局部变量，差异按位置参数构造
+        extend = diffs.extend
+        DR = DiffResult
+        ADDED = DiffType.ADDED
+        DELETED = DiffType.DELETED
+        # 按忽略选项生成的专用比较函数，逐单元格比较时不再判断选项
+        values_differ = cls.build_differ(options)
+        get_diff_type = cls.get_diff_type
+        
+        # 一次性提取整个工作表的单元格值，按行索引直接取行数据
+        values_a = sheet_a.get_values()
+        values_b = sheet_b.get_values()
+        # 文本形式（去除前后空格）同样按工作表缓存，主键、标题和空值判断共用
+        texts_a = sheet_a.get_texts()
+        texts_b = sheet_b.get_texts()
+        
+        # 构建列映射（首行匹配列）
+        col_map_b_to_a = {}  # B的列索引 -> A的列索引
+        col_map_a_to_b = {}  # A的列索引 -> B的列索引
+
+        if header_row is not None:
+            logger.debug("工作表 '%s': 启用标题行匹配，标题行索引=%d", sheet_name, header_row)
+            # 获取标题行
+            headers_a = {}
+            headers_b = {}
+            header_texts_a = texts_a[header_row] if 0 <= header_row < len(texts_a) else []
+            header_texts_b = texts_b[header_row] if 0 <= header_row < len(texts_b) else []
+            # 标题匹配始终忽略大小写；键经 sys.intern 驻留，建立列映射时相同标题按指针命中
+            for col_idx, text in enumerate(header_texts_a):
+                if text:
+                    headers_a[sys.intern(text.lower())] = col_idx
+
+            for col_idx, text in enumerate(header_texts_b):
+                if text:
+                    headers_b[sys.intern(text.lower())] = col_idx
+
+            logger.debug("A文件标题: %s", headers_a)
+            logger.debug("B文件标题: %s", headers_b)
+
+            # 建立列映射
+            for header, col_a in headers_a.items():
+                if header in headers_b:
+                    col_b = headers_b[header]
+                    col_map_a_to_b[col_a] = col_b
+                    col_map_b_to_a[col_b] = col_a
+
+            logger.debug("列映射 A->B: %s", col_map_a_to_b)
+        else:
+            logger.debug("工作表 '%s': 未启用标题行匹配", sheet_name)
+
+        # 列映射不改变列位置时（或按位置比较），整行相等即可确定该行无差异，
+        # 先用整行比较跳过相同的行，只对不同的行逐单元格比较
+        same_layout = all(col_a == col_b for col_a, col_b in col_map_a_to_b.items())
+
+        # 值网格的每行都补齐到工作表列数，列映射来自标题行，列索引不会越界；
+        # 按位置比较且两表列数不同时，较窄一侧的行补 None 后再按列比较
+        width_a = sheet_a.col_count
+        width_b = sheet_b.col_count
+        if col_map_a_to_b:
+            pad_a = pad_b = []
+        else:
+            pad_a = [None] * (width_b - width_a) if width_b > width_a else []
+            pad_b = [None] * (width_a - width_b) if width_a > width_b else []
+
+        if key_col1_a is not None:
+            # 使用主键列匹配行（A文件和B文件分别指定主键列）
+            rows_a = defaultdict(list)
+            rows_b = defaultdict(list)
+
+            # 按列一次性生成所有行的主键
+            keys_a = cls._build_row_keys(texts_a, key_col1_a, key_col2_a, options.ignore_case)
+            for row_idx, norm_key in enumerate(keys_a):
+                if norm_key and row_idx != header_row:  # 跳过标题行
+                    rows_a[norm_key].append((row_idx, values_a[row_idx]))
+
+            logger.debug("A文件提取到 %d 个唯一主键", len(rows_a))
+
+            # 主键列不使用列映射，始终从指定的列索引提取；B文件未指定主键列时没有可匹配的行
+            if key_col1_b is None:
+                keys_b = [""] * len(texts_b)
+            else:
+                keys_b = cls._build_row_keys(texts_b, key_col1_b, key_col2_b, options.ignore_case)
+            for row_idx, norm_key in enumerate(keys_b):
+                if norm_key and row_idx != header_row:
+                    rows_b[norm_key].append((row_idx, values_b[row_idx]))
+
+            logger.debug("B文件提取到 %d 个唯一主键", len(rows_b))
+
+            keys_a = rows_a.keys()
+            keys_b = rows_b.keys()
+            common_keys = keys_a & keys_b
+            key_span = sheet_span / len(common_keys) if common_keys else 0
+
+            # 未匹配的行：仅一方存在的主键的所有行，加上同主键下多出的行
+            deleted_rows = [row for key in keys_a - keys_b for row in rows_a[key]]
+            added_rows = [row for key in keys_b - keys_a for row in rows_b[key]]
+
+            # 需要比较的列对（按列映射或按位置），预先去掉A、B两边的主键列
+            if col_map_a_to_b:
+                col_pairs = list(col_map_a_to_b.items())
+            else:
+                col_pairs = [(col, col) for col in range(max(width_a, width_b))]
+            col_pairs = [
+                (col_a, col_b) for col_a, col_b in col_pairs
+                if col_a not in skip_a and col_b not in skip_b
+            ]
+
+            for key_idx, key in enumerate(common_keys):
+                if progress_cb and key_idx % cls.PROGRESS_INTERVAL == 0:
+                    progress_cb(
+                        int(sheet_progress + key_idx * key_span),
+                        f"正在比较工作表 {sheet_name}..."
+                    )
+
+                # 贪婪匹配：按位置距离最小的优先匹配
+                matches, unmatched_a, unmatched_b = cls.match_rows_by_distance(
+                    rows_a[key], rows_b[key]
+                )
+                deleted_rows.extend(unmatched_a)
+                added_rows.extend(unmatched_b)
+
+                # 处理匹配的行：先找出不同的单元格，再批量构造差异
+                for (row_idx_a, row_data_a), (row_idx_b, row_data_b) in matches:
+                    if same_layout and row_data_a == row_data_b:
+                        continue
+                    if pad_a:
+                        row_data_a = row_data_a + pad_a
+                    if pad_b:
+                        row_data_b = row_data_b + pad_b
+                    diff_cells = [
+                        (col_a, col_b, row_data_a[col_a], row_data_b[col_b])
+                        for col_a, col_b in col_pairs
+                        if values_differ(row_data_a[col_a], row_data_b[col_b])
+                    ]
+                    if diff_cells:
+                        extend([
+                            DR(sheet_name, row_idx_a, col_a, get_diff_type(val_a, val_b),
+                               val_a, val_b, row_idx_b, col_b)
+                            for col_a, col_b, val_a, val_b in diff_cells
+                        ])
+
+            # 处理未匹配的A（删除整行）
+            for row_idx_a, row_data_a in deleted_rows:
+                row_texts = texts_a[row_idx_a]
+                extend([
+                    DR(sheet_name, row_idx_a, col_idx, DELETED, val)
+                    for col_idx, val in enumerate(row_data_a)
+                    if row_texts[col_idx]
+                ])
+
+            # 处理未匹配的B（新增整行）
+            for row_idx_b, row_data_b in added_rows:
+                row_texts = texts_b[row_idx_b]
+                extend([
+                    DR(sheet_name, row_idx_b, col_idx, ADDED, None, val, row_idx_b, col_idx)
+                    for col_idx, val in enumerate(row_data_b)
+                    if row_texts[col_idx]
+                ])
+        else:
+            # 只使用首行匹配列，按位置匹配行
+            col_pairs = list(col_map_a_to_b.items())
+            # 超出工作表行数的一侧按全空行比较
+            empty_row_a = [None] * width_a
+            empty_row_b = [None] * width_b
+            max_rows = max(sheet_a.row_count, sheet_b.row_count)
+            for row_idx in range(max_rows):
+                if header_row is not None and row_idx == header_row:
+                    continue
+                if progress_cb and row_idx % cls.PROGRESS_INTERVAL == 0:
+                    progress_cb(
+                        int(sheet_progress + row_idx * sheet_span / max_rows),
+                        f"正在比较工作表 {sheet_name}..."
+                    )
+                
+                row_data_a = values_a[row_idx] if row_idx < sheet_a.row_count else empty_row_a
+                row_data_b = values_b[row_idx] if row_idx < sheet_b.row_count else empty_row_b
+                if same_layout and row_data_a == row_data_b:
+                    continue
+                
+                diff_cells = [
+                    (col_a, col_b, row_data_a[col_a], row_data_b[col_b])
+                    for col_a, col_b in col_pairs
+                    if values_differ(row_data_a[col_a], row_data_b[col_b])
+                ]
+                if diff_cells:
+                    extend([
+                        DR(sheet_name, row_idx, col_a, get_diff_type(val_a, val_b),
+                           val_a, val_b, row_idx, col_b)
+                        for col_a, col_b, val_a, val_b in diff_cells
+                    ])
+        
+        return diffs
+    
+    @classmethod
+    def _build_row_keys(
+        cls,
+        texts: List[List[str]],
+        col1: int,
+        col2: Optional[int],
+        ignore_case: bool
+    ) -> List[str]:
+        """
+        按列生成每一行的主键（复合主键用 "|" 连接）
+        
+        Args:
+            texts: 工作表的单元格文本（SheetData.get_texts()）
+            
+        Returns:
+            与 texts 等长的主键列表，主键列1为空的行对应空字符串
+        """
+        keys = cls._column_texts(texts, col1)
+        if col2 is not None:
+            texts2 = cls._column_texts(texts, col2)
+            keys = [
+                (k1 + "|" + k2 if k2 else k1) if k1 else ""
+                for k1, k2 in zip(keys, texts2)
+            ]
+        if ignore_case:
+            keys = [k.lower() for k in keys]
+        return keys
+    
+    @staticmethod
+    def _column_texts(texts: List[List[str]], col: int) -> List[str]:
+        """提取一列的文本，超出列范围时为空字符串"""
+        width = len(texts[0]) if texts else 0
+        if col >= width:
+            return [""] * len(texts)
+        return [row[col] for row in texts]
+    
+    @staticmethod
+    def match_rows_by_distance(
+        list_a: List[Tuple[int, Any]],
+        list_b: List[Tuple[int, Any]]
+    ) -> Tuple[List[Tuple[Tuple[int, Any], Tuple[int, Any]]], List[Tuple[int, Any]], List[Tuple[int, Any]]]:
+        """
+        贪婪匹配同一主键下的多行：按行号距离最小的优先匹配
+        
+        Args:
+            list_a: 文件A中该主键的行 [(行号, 行数据), ...]，按行号升序
+            list_b: 文件B中该主键的行
+            
+        Returns:
+            (匹配的行对列表, A中未匹配的行, B中未匹配的行)，未匹配的行保持原顺序
+        """
+        n, m = len(list_a), len(list_b)
+        
+        # 常见情况：主键唯一或只有一侧存在，无需构建配对表
+        if n == 0 or m == 0:
+            return [], list_a, list_b
+        if n == 1 and m == 1:
+            return [(list_a[0], list_b[0])], [], []
+        if n == 1:
+            row_a = list_a[0][0]
+            j = min(range(m), key=lambda j: abs(row_a - list_b[j][0]))
+            return [(list_a[0], list_b[j])], [], list_b[:j] + list_b[j + 1:]
+        if m == 1:
+            row_b = list_b[0][0]
+            i = min(range(n), key=lambda i: abs(list_a[i][0] - row_b))
+            return [(list_a[i], list_b[0])], list_a[:i] + list_a[i + 1:], []
+        
+        # 两侧都有重复行：把两侧的行按行号合并排序。当前距离最小的配对总是合并序列中
+        # 相邻的一对 A/B 行，因此只需用堆维护相邻配对，按 (距离, i, j) 依次弹出，
+        # 结果与对所有配对按距离排序后贪婪选择相同，复杂度 O((n+m)·log(n+m))
+        merged = sorted(
+            [(row_idx, 0, i) for i, (row_idx, _) in enumerate(list_a)] +
+            [(row_idx, 1, j) for j, (row_idx, _) in enumerate(list_b)]
+        )
+        size = len(merged)
+        prev_pos = list(range(-1, size - 1))
+        next_pos = list(range(1, size + 1))
+        
+        def adjacent_pair(p, q):
+            """合并序列中相邻的 p < q 位置若分属两侧，返回堆元素"""
+            row_p, side_p, idx_p = merged[p]
+            row_q, side_q, idx_q = merged[q]
+            if side_p == side_q:
+                return None
+            if side_p == 0:
+                return (row_q - row_p, idx_p, idx_q, p, q)
+            return (row_q - row_p, idx_q, idx_p, p, q)
+        
+        heap = [pair for pair in (adjacent_pair(p, p + 1) for p in range(size - 1)) if pair]
+        heapq.heapify(heap)
+        
+        matches = []
+        used_a = set()
+        used_b = set()
+        while heap:
+            _, i, j, p, q = heapq.heappop(heap)
+            if i in used_a or j in used_b:
+                continue
+            matches.append((list_a[i], list_b[j]))
+            used_a.add(i)
+            used_b.add(j)
+            # 移除 p、q 后，两侧的邻居成为新的相邻配对
+            left, right = prev_pos[p], next_pos[q]
+            if left >= 0:
+                next_pos[left] = right
+            if right < size:
+                prev_pos[right] = left
+            if left >= 0 and right < size:
+                pair = adjacent_pair(left, right)
+                if pair:
+                    heapq.heappush(heap, pair)
+        
+        unmatched_a = [row for i, row in enumerate(list_a) if i not in used_a]
+        unmatched_b = [row for j, row in enumerate(list_b) if j not in used_b]
+        return matches, unmatched_a, unmatched_b
+    
+    @staticmethod
+    def normalize_values(values: List[Any], options: CompareOptions) -> List[Any]:
+        """
+        按忽略选项（忽略大小写、忽略前后空格、忽略空白）标准化一行值，用于批量比较
+        
+        忽略空白时空字符串统一为 None，两侧都为空即相等，因此标准化后两值 != 即为不同，
+        与 values_differ 的判断一致，逐单元格比较时不再需要额外的空值判断。
+        未启用相关选项时直接返回原列表。
+        """
+        ignore_case = options.ignore_case
+        ignore_whitespace = options.ignore_whitespace
+        ignore_empty = options.ignore_empty_rows
+        if not (ignore_case or ignore_whitespace or ignore_empty):
+            return values
+        normalized = []
+        for val in values:
+            if isinstance(val, str):
+                if ignore_case:
+                    val = val.lower()
+                if ignore_whitespace:
+                    val = val.strip()
+                if ignore_empty and not val:
+                    val = None
+            normalized.append(val)
+        return normalized
+    
+    @classmethod
+    def values_differ(cls, val_a, val_b, options: CompareOptions) -> bool:
+        """判断两个值是否不同（应用忽略选项）"""
+        cmp_a, cmp_b = val_a, val_b
+        if options.ignore_case:
+            if isinstance(cmp_a, str): cmp_a = cmp_a.lower()
+            if isinstance(cmp_b, str): cmp_b = cmp_b.lower()
+        if options.ignore_whitespace:
+            if isinstance(cmp_a, str): cmp_a = cmp_a.strip()
+            if isinstance(cmp_b, str): cmp_b = cmp_b.strip()
+        if options.ignore_empty_rows:
+            if (cmp_a is None or cmp_a == "") and (cmp_b is None or cmp_b == ""):
+                return False
+        return cmp_a != cmp_b
+    
+    @staticmethod
+    def build_differ(options: CompareOptions) -> Callable[[Any, Any], bool]:
+        """
+        按忽略选项生成专用的值比较函数 differ(val_a, val_b)，结果与 values_differ 相同
+        
+        选项在生成时确定，返回的函数内部不再判断选项；未启用任何选项时直接返回 operator.ne。
+        原始值相等时标准化后必然相等，先做一次相等判断，相同的单元格无需标准化。
+        """
+        ignore_case = options.ignore_case
+        ignore_whitespace = options.ignore_whitespace
+        ignore_empty = options.ignore_empty_rows
+        if not (ignore_case or ignore_whitespace or ignore_empty):
+            return operator.ne
+        
+        if ignore_case and ignore_whitespace:
+            def normalize(val):
+                return val.lower().strip() if isinstance(val, str) else val
+        elif ignore_case:
+            def normalize(val):
+                return val.lower() if isinstance(val, str) else val
+        elif ignore_whitespace:
+            def normalize(val):
+                return val.strip() if isinstance(val, str) else val
+        else:
+            normalize = None
+        
+        if not ignore_empty:
+            def differ(val_a, val_b):
+                return val_a != val_b and normalize(val_a) != normalize(val_b)
+        elif normalize is None:
+            def differ(val_a, val_b):
+                if val_a == val_b:
+                    return False
+                return not ((val_a is None or val_a == "") and (val_b is None or val_b == ""))
+        else:
+            def differ(val_a, val_b):
+                if val_a == val_b:
+                    return False
+                val_a = normalize(val_a)
+                val_b = normalize(val_b)
+                if (val_a is None or val_a == "") and (val_b is None or val_b == ""):
+                    return False
+                return val_a != val_b
+        return differ
+    
+    @classmethod
+    def get_diff_type(cls, val_a, val_b) -> DiffType:
+        """获取差异类型"""
+        if (val_a is None or val_a == "") and val_b:
+            return DiffType.ADDED
+        elif val_a and (val_b is None or val_b == ""):
+            return DiffType.DELETED
+        return DiffType.MODIFIED
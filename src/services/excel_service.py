@@ -3,10 +3,12 @@ Excel 文件解析服务
 
 支持 .xlsx 和 .xls 格式的文件读取。
 """
+import logging
 import os
+import sys
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import Any, Callable, Iterable, List, Optional
 
 import openpyxl
 from openpyxl.cell.cell import Cell
@@ -15,6 +17,9 @@ from openpyxl.utils import get_column_letter
 from src.models.excel_model import (
     CellData, CellStyle, CellType, SheetData, WorkbookData
 )
+from src.services.fast_xlsx import XlsxValueReader
+
+logger = logging.getLogger(__name__)
 
 
 class ExcelService:
@@ -24,14 +29,24 @@ class ExcelService:
     SUPPORTED_EXTENSIONS = {'.xlsx', '.xls'}
     # 最大文件大小 (100MB)
     MAX_FILE_SIZE = 100 * 1024 * 1024
+    # 读取工作表时每读取多少行回报一次进度（回调中可检查取消请求）
+    PROGRESS_ROWS = 1000
     
     @classmethod
-    def load_file(cls, file_path: str) -> WorkbookData:
+    def load_file(
+        cls,
+        file_path: str,
+        read_only: bool = False,
+        progress_cb: Optional[Callable[[int, str], None]] = None
+    ) -> WorkbookData:
         """
         加载 Excel 文件
         
         Args:
             file_path: 文件路径
+            read_only: 只读取单元格值（.xlsx 直接流式解析工作表 XML，不解析样式和批注），
+                       适用于只做内容比较的场景；.xls 文件忽略此参数
+            progress_cb: 进度回调 (百分比 0-100, 消息)，每个工作表开始时及每读取 PROGRESS_ROWS 行回报一次
             
         Returns:
             WorkbookData 对象
@@ -52,37 +67,50 @@ class ExcelService:
             raise ValueError(f"不支持的文件格式: {ext}，仅支持 .xlsx 和 .xls")
         
         # 检查文件大小
-        file_size = path.stat().st_size
+        stat = path.stat()
+        file_size = stat.st_size
         if file_size > cls.MAX_FILE_SIZE:
             raise ValueError(f"文件大小超过限制 (最大 100MB)")
         
         # 获取文件信息
-        modified_time = datetime.fromtimestamp(path.stat().st_mtime)
+        modified_time = datetime.fromtimestamp(stat.st_mtime)
         
         # 根据扩展名选择解析方法
         if ext == '.xlsx':
-            sheets = cls._load_xlsx(file_path)
+            if read_only:
+                sheets = cls._load_xlsx_values(file_path, progress_cb)
+            else:
+                sheets = cls._load_xlsx(file_path, progress_cb)
         else:  # .xls
-            sheets = cls._load_xls(file_path)
+            sheets = cls._load_xls(file_path, progress_cb)
         
         return WorkbookData(
             file_path=file_path,
             file_name=path.name,
             file_size=file_size,
             modified_time=modified_time.strftime("%Y-%m-%d %H:%M:%S"),
+            mtime_ns=stat.st_mtime_ns,
             sheets=sheets,
-            sheet_names=[s.name for s in sheets]
+            sheet_names=[s.name for s in sheets],
+            read_only=read_only and ext == '.xlsx'
         )
     
     @classmethod
-    def _load_xlsx(cls, file_path: str) -> list[SheetData]:
+    def _load_xlsx(
+        cls,
+        file_path: str,
+        progress_cb: Optional[Callable[[int, str], None]] = None
+    ) -> list[SheetData]:
         """加载 .xlsx 文件"""
         try:
             # data_only=True 获取计算后的值，而不是公式
             wb = openpyxl.load_workbook(file_path, data_only=False, read_only=False)
             sheets = []
             
-            for sheet_name in wb.sheetnames:
+            sheet_count = len(wb.sheetnames)
+            for sheet_idx, sheet_name in enumerate(wb.sheetnames):
+                if progress_cb:
+                    progress_cb(sheet_idx * 100 // sheet_count, f"正在读取工作表 {sheet_name}...")
                 ws = wb[sheet_name]
                 rows = []
                 
@@ -91,6 +119,11 @@ class ExcelService:
                 max_col = ws.max_column or 0
                 
                 for row_idx in range(1, max_row + 1):
+                    if progress_cb and row_idx % cls.PROGRESS_ROWS == 0:
+                        progress_cb(
+                            (sheet_idx * 100 + row_idx * 100 // max_row) // sheet_count,
+                            f"正在读取工作表 {sheet_name}..."
+                        )
                     row_data = []
                     for col_idx in range(1, max_col + 1):
                         cell = ws.cell(row=row_idx, column=col_idx)
@@ -99,7 +132,7 @@ class ExcelService:
                     rows.append(row_data)
                 
                 sheets.append(SheetData(
-                    name=sheet_name,
+                    name=sys.intern(sheet_name),
                     rows=rows,
                     row_count=max_row,
                     col_count=max_col
@@ -112,7 +145,115 @@ class ExcelService:
             raise ValueError(f"无法读取 Excel 文件: {str(e)}")
     
     @classmethod
-    def _load_xls(cls, file_path: str) -> list[SheetData]:
+    def _load_xlsx_values(
+        cls,
+        file_path: str,
+        progress_cb: Optional[Callable[[int, str], None]] = None
+    ) -> list[SheetData]:
+        """只读取 .xlsx 文件的单元格值（不含样式和批注）"""
+        try:
+            return cls._load_xlsx_fast(file_path, progress_cb)
+        except Exception as e:
+            # 数组公式等快速读取不支持的内容或非常规的文件结构，交给 openpyxl 处理
+            logger.debug("快速读取 '%s' 失败，改用 openpyxl 只读模式: %s", file_path, e)
+        return cls._load_xlsx_read_only(file_path, progress_cb)
+    
+    @classmethod
+    def _load_xlsx_fast(
+        cls,
+        file_path: str,
+        progress_cb: Optional[Callable[[int, str], None]] = None
+    ) -> list[SheetData]:
+        """直接流式解析工作表 XML 读取单元格值（比 openpyxl 只读模式快约一倍）"""
+        sheets = []
+        with XlsxValueReader(file_path) as reader:
+            sheet_count = len(reader.sheets)
+            for sheet_idx, (sheet_name, part) in enumerate(reader.sheets):
+                if progress_cb:
+                    progress_cb(sheet_idx * 100 // sheet_count, f"正在读取工作表 {sheet_name}...")
+                total_rows, total_cols = reader.sheet_dimension(part)
+                sheets.append(cls._build_value_sheet(
+                    sheet_name, reader.iter_rows(part, total_cols), total_rows,
+                    sheet_idx, sheet_count, progress_cb
+                ))
+        return sheets
+    
+    @classmethod
+    def _load_xlsx_read_only(
+        cls,
+        file_path: str,
+        progress_cb: Optional[Callable[[int, str], None]] = None
+    ) -> list[SheetData]:
+        """以 openpyxl 只读模式加载 .xlsx 文件（流式逐行读取单元格值）"""
+        try:
+            # 保留公式文本（公式比较模式需要），不加载外部链接缓存
+            wb = openpyxl.load_workbook(file_path, data_only=False, read_only=True, keep_links=False)
+            sheets = []
+            
+            try:
+                sheet_count = len(wb.worksheets)
+                for sheet_idx, ws in enumerate(wb.worksheets):
+                    if progress_cb:
+                        progress_cb(sheet_idx * 100 // sheet_count, f"正在读取工作表 {ws.title}...")
+                    # 只读模式的维度信息来自文件记录，可能缺失，仅用于估算进度
+                    sheets.append(cls._build_value_sheet(
+                        ws.title, ws.iter_rows(values_only=True), ws.max_row or 0,
+                        sheet_idx, sheet_count, progress_cb
+                    ))
+            finally:
+                # 只读模式保持文件句柄打开，必须显式关闭
+                wb.close()
+            
+            return sheets
+            
+        except Exception as e:
+            raise ValueError(f"无法读取 Excel 文件: {str(e)}")
+    
+    @classmethod
+    def _build_value_sheet(
+        cls,
+        sheet_name: str,
+        value_rows: Iterable[Iterable[Any]],
+        total_rows: int,
+        sheet_idx: int,
+        sheet_count: int,
+        progress_cb: Optional[Callable[[int, str], None]] = None
+    ) -> SheetData:
+        """
+        由逐行的单元格值构建工作表数据
+        
+        Args:
+            sheet_name: 工作表名称
+            value_rows: 单元格值的行迭代器
+            total_rows: 预计行数（来自文件记录的维度，可能为 0），仅用于估算进度
+            sheet_idx: 工作表序号
+            sheet_count: 工作表总数
+            progress_cb: 进度回调
+        """
+        rows: List[List[CellData]] = []
+        for row_idx, values in enumerate(value_rows, 1):
+            if progress_cb and row_idx % cls.PROGRESS_ROWS == 0:
+                row_percent = min(row_idx * 100 // total_rows, 100) if total_rows else 0
+                progress_cb(
+                    (sheet_idx * 100 + row_percent) // sheet_count,
+                    f"正在读取工作表 {sheet_name}..."
+                )
+            rows.append([cls._parse_value(value) for value in values])
+        
+        # 工作表名称驻留：两个工作簿的同名工作表作为字典键查找时按指针比较
+        return SheetData(
+            name=sys.intern(sheet_name),
+            rows=rows,
+            row_count=len(rows),
+            col_count=max((len(row) for row in rows), default=0)
+        )
+    
+    @classmethod
+    def _load_xls(
+        cls,
+        file_path: str,
+        progress_cb: Optional[Callable[[int, str], None]] = None
+    ) -> list[SheetData]:
         """加载 .xls 文件（使用 xlrd）"""
         try:
             import xlrd
@@ -121,9 +262,16 @@ class ExcelService:
             
             for sheet_idx in range(wb.nsheets):
                 ws = wb.sheet_by_index(sheet_idx)
+                if progress_cb:
+                    progress_cb(sheet_idx * 100 // wb.nsheets, f"正在读取工作表 {ws.name}...")
                 rows = []
                 
                 for row_idx in range(ws.nrows):
+                    if progress_cb and row_idx and row_idx % cls.PROGRESS_ROWS == 0:
+                        progress_cb(
+                            (sheet_idx * 100 + row_idx * 100 // ws.nrows) // wb.nsheets,
+                            f"正在读取工作表 {ws.name}..."
+                        )
                     row_data = []
                     for col_idx in range(ws.ncols):
                         cell = ws.cell(row_idx, col_idx)
@@ -132,7 +280,7 @@ class ExcelService:
                     rows.append(row_data)
                 
                 sheets.append(SheetData(
-                    name=ws.name,
+                    name=sys.intern(ws.name),
                     rows=rows,
                     row_count=ws.nrows,
                     col_count=ws.ncols
@@ -193,6 +341,30 @@ class ExcelService:
             comment=comment
         )
     
+    @classmethod
+    def _parse_value(cls, value) -> CellData:
+        """解析只读模式下的单元格值（公式以 '=' 开头的字符串形式给出）"""
+        formula = None
+        if isinstance(value, str) and value.startswith('='):
+            formula = value
+            cell_type = CellType.FORMULA
+        elif value is None or value == "":
+            cell_type = CellType.EMPTY
+        elif isinstance(value, bool):
+            cell_type = CellType.BOOLEAN
+        elif isinstance(value, (int, float)):
+            cell_type = CellType.NUMBER
+        elif isinstance(value, datetime):
+            cell_type = CellType.DATE
+        else:
+            cell_type = CellType.STRING
+        
+        return CellData(
+            value=value,
+            formula=formula,
+            cell_type=cell_type
+        )
+    
     @classmethod
     def _parse_xls_cell(cls, cell, workbook) -> CellData:
         """解析 xlrd 单元格"""
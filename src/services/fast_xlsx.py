@@ -0,0 +1,317 @@
+"""
+.xlsx 单元格值快速读取
+
+直接用 zipfile 和 ElementTree.iterparse 流式解析共享字符串表和工作表 XML，只提取单元格值，
+省去 openpyxl 只读模式为每个单元格构建字典、解析坐标和字符串对象的开销。
+结果与 openpyxl 只读模式 iter_rows(values_only=True) 一致（公式以 '=' 开头的字符串给出）。
+数组公式、数据表公式等少见内容不做处理，抛出 UnsupportedXlsxError，由调用方回退到 openpyxl。
+"""
+import mmap
+import posixpath
+import sys
+import zipfile
+from typing import Any, Dict, Iterator, List, Set, Tuple
+from xml.etree.ElementTree import fromstring, iterparse
+
+from openpyxl.formula.translate import Translator
+from openpyxl.styles.numbers import BUILTIN_FORMATS, is_date_format, is_timedelta_format
+from openpyxl.utils.datetime import CALENDAR_MAC_1904, CALENDAR_WINDOWS_1900, from_ISO8601, from_excel
+
+from src.models.diff_model import letter_to_col
+
+
+_MAIN_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_DOC_REL_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+_PKG_REL_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+_ROW_TAG = _MAIN_NS + "row"
+_VALUE_TAG = _MAIN_NS + "v"
+_FORMULA_TAG = _MAIN_NS + "f"
+_INLINE_TAG = _MAIN_NS + "is"
+_TEXT_TAG = _MAIN_NS + "t"
+_RUN_TAG = _MAIN_NS + "r"
+_STRING_TAG = _MAIN_NS + "si"
+_DIMENSION_TAG = _MAIN_NS + "dimension"
+_SHEET_DATA_TAG = _MAIN_NS + "sheetData"
+
+_DIGITS = "0123456789"
+
+
+class UnsupportedXlsxError(Exception):
+    """文件包含快速读取不支持的内容，需要回退到 openpyxl"""
+
+
+class _MappedFile(mmap.mmap):
+    """只读内存映射文件（补上 zipfile 需要的 seekable，Python 3.13 起 mmap 自带）"""
+    
+    def seekable(self) -> bool:
+        return True
+
+
+def _cast_number(text: str):
+    """数值文本转为 int 或 float（与 openpyxl 规则一致）"""
+    if "." in text or "E" in text or "e" in text:
+        return float(text)
+    return int(text)
+
+
+def _text_content(element) -> str:
+    """富文本/纯文本节点的文字内容（忽略格式和注音）"""
+    parts = []
+    plain = element.findtext(_TEXT_TAG)
+    if plain:
+        parts.append(plain)
+    for run in element.iterfind(_RUN_TAG):
+        text = run.findtext(_TEXT_TAG)
+        if text:
+            parts.append(text)
+    return "".join(parts)
+
+
+class XlsxValueReader:
+    """
+    .xlsx 单元格值读取器
+    
+    用法:
+        with XlsxValueReader(path) as reader:
+            for name, part in reader.sheets:
+                for row in reader.iter_rows(part): ...
+    """
+    
+    def __init__(self, file_path: str):
+        # 文件映射到内存后交给 zipfile 随机读取：各部件直接从页缓存解压，
+        # 不再经过文件对象的读缓冲，也省去每次定位读取的系统调用
+        with open(file_path, "rb") as f:
+            self._map = _MappedFile(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._zip = zipfile.ZipFile(self._map)
+        except BaseException:
+            self._map.close()
+            raise
+        try:
+            self._parse_workbook()
+        except BaseException:
+            self.close()
+            raise
+    
+    def __enter__(self) -> "XlsxValueReader":
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+    
+    def close(self):
+        """关闭文件"""
+        self._zip.close()
+        self._map.close()
+    
+    def _read_rels(self, part: str) -> Dict[str, Tuple[str, str]]:
+        """读取部件的关系表: Id -> (类型, 目标部件路径)"""
+        folder, name = posixpath.split(part)
+        rels_path = posixpath.join(folder, "_rels", name + ".rels")
+        if rels_path not in self._zip.NameToInfo:
+            return {}
+        rels = {}
+        for rel in fromstring(self._zip.read(rels_path)).iter(_PKG_REL_NS + "Relationship"):
+            if rel.get("TargetMode") == "External":
+                continue
+            target = rel.get("Target", "")
+            if target.startswith("/"):
+                target = target[1:]
+            else:
+                target = posixpath.normpath(posixpath.join(folder, target))
+            rels[rel.get("Id")] = (rel.get("Type", ""), target)
+        return rels
+    
+    def _parse_workbook(self):
+        """解析工作簿结构：工作表列表、共享字符串、日期样式和日期基准"""
+        workbook_part = next(
+            (target for rel_type, target in self._read_rels("").values()
+             if rel_type.endswith("/officeDocument")),
+            "xl/workbook.xml"
+        )
+        root = fromstring(self._zip.read(workbook_part))
+        if root.tag != _MAIN_NS + "workbook":
+            # Strict Open XML 等其他命名空间
+            raise UnsupportedXlsxError(f"不支持的工作簿格式: {root.tag}")
+        
+        rels = self._read_rels(workbook_part)
+        
+        # 工作表（跳过图表工作表）
+        self.sheets: List[Tuple[str, str]] = []
+        for sheet in root.iter(_MAIN_NS + "sheet"):
+            rel_type, target = rels.get(sheet.get(_DOC_REL_NS + "id"), ("", ""))
+            if rel_type.endswith("/worksheet"):
+                self.sheets.append((sheet.get("name"), target))
+        
+        # 日期基准
+        self._epoch = CALENDAR_WINDOWS_1900
+        workbook_pr = root.find(_MAIN_NS + "workbookPr")
+        if workbook_pr is not None and workbook_pr.get("date1904") in ("1", "true"):
+            self._epoch = CALENDAR_MAC_1904
+        
+        self._shared_strings: List[str] = []
+        self._date_styles: Set[int] = set()
+        self._timedelta_styles: Set[int] = set()
+        for rel_type, target in rels.values():
+            if rel_type.endswith("/sharedStrings"):
+                self._shared_strings = self._read_shared_strings(target)
+            elif rel_type.endswith("/styles"):
+                self._read_styles(target)
+    
+    def _read_shared_strings(self, part: str) -> List[str]:
+        """
+        流式读取共享字符串表
+        
+        字符串经 sys.intern 驻留，两个工作簿中相同的文本（标题、枚举值等）是同一对象，
+        比较时整行相等判断可直接按指针命中。
+        """
+        intern = sys.intern
+        strings = []
+        with self._zip.open(part) as source:
+            for _event, element in iterparse(source):
+                if element.tag == _STRING_TAG:
+                    strings.append(intern(_text_content(element).replace("x005F_", "")))
+                    element.clear()
+        return strings
+    
+    def _read_styles(self, part: str):
+        """读取单元格样式，记录数字格式为日期/时长的样式序号"""
+        root = fromstring(self._zip.read(part))
+        custom_formats = {
+            int(fmt.get("numFmtId")): fmt.get("formatCode")
+            for fmt in root.iter(_MAIN_NS + "numFmt")
+        }
+        cell_xfs = root.find(_MAIN_NS + "cellXfs")
+        if cell_xfs is None:
+            return
+        for style_id, xf in enumerate(cell_xfs.iterfind(_MAIN_NS + "xf")):
+            fmt_id = int(xf.get("numFmtId", 0))
+            fmt = custom_formats.get(fmt_id) or BUILTIN_FORMATS.get(fmt_id)
+            if is_date_format(fmt):
+                self._date_styles.add(style_id)
+            if is_timedelta_format(fmt):
+                self._timedelta_styles.add(style_id)
+    
+    def sheet_dimension(self, part: str) -> Tuple[int, int]:
+        """
+        读取工作表记录的使用范围 (最大行号, 最大列号)，没有记录时返回 (0, 0)
+        
+        维度信息位于工作表 XML 开头，读到单元格数据前即停止。
+        """
+        with self._zip.open(part) as source:
+            for _event, element in iterparse(source, events=("start",)):
+                if element.tag == _DIMENSION_TAG:
+                    last = element.get("ref", "").rpartition(":")[2].replace("$", "")
+                    letters = last.rstrip(_DIGITS)
+                    digits = last[len(letters):]
+                    if letters and digits:
+                        return int(digits), letter_to_col(letters) + 1
+                    break
+                if element.tag == _SHEET_DATA_TAG:
+                    break
+        return 0, 0
+    
+    def iter_rows(self, part: str, min_width: int = 0) -> Iterator[List[Any]]:
+        """
+        逐行读取工作表单元格值
+        
+        与 openpyxl 只读模式相同，中间缺失的行以空行补齐，每行至少补齐到 min_width 列
+        （通常传入 sheet_dimension 的列数）；但不会按维度信息截断超出范围的数据。
+        
+        Yields:
+            单元格值列表，空单元格为 None
+        """
+        empty_row = [None] * min_width
+        next_row = 1
+        with self._zip.open(part) as source:
+            for row_idx, values in self._iter_parsed_rows(source):
+                if row_idx < next_row:
+                    # 行号重复或倒序，与 openpyxl 一样忽略
+                    continue
+                while next_row < row_idx:
+                    yield empty_row.copy()
+                    next_row += 1
+                if len(values) < min_width:
+                    values.extend([None] * (min_width - len(values)))
+                yield values
+                next_row += 1
+    
+    def _iter_parsed_rows(self, source) -> Iterator[Tuple[int, List[Any]]]:
+        """解析 <row> 元素，产出 (行号, 值列表)"""
+        shared_strings = self._shared_strings
+        date_styles = self._date_styles
+        timedelta_styles = self._timedelta_styles
+        epoch = self._epoch
+        shared_formulae: Dict[str, Translator] = {}
+        col_cache: Dict[str, int] = {}
+        
+        row_idx = 0
+        for _event, row in iterparse(source):
+            if row.tag != _ROW_TAG:
+                continue
+            
+            r = row.get("r")
+            row_idx = int(float(r)) if r else row_idx + 1
+            
+            values: List[Any] = []
+            col = 0
+            for cell in row:
+                coordinate = cell.get("r")
+                if coordinate:
+                    letters = coordinate.rstrip(_DIGITS)
+                    col = col_cache.get(letters)
+                    if col is None:
+                        col = col_cache[letters] = letter_to_col(letters) + 1
+                else:
+                    col += 1
+                
+                data_type = cell.get("t", "n")
+                formula = cell.find(_FORMULA_TAG)
+                if formula is not None:
+                    value = "=" + (formula.text or "")
+                    formula_type = formula.get("t")
+                    if formula_type == "shared":
+                        index = formula.get("si")
+                        if coordinate is None:
+                            raise UnsupportedXlsxError("共享公式缺少单元格坐标")
+                        if index in shared_formulae:
+                            value = shared_formulae[index].translate_formula(coordinate)
+                        elif value != "=":
+                            shared_formulae[index] = Translator(value, coordinate)
+                    elif formula_type is not None and formula_type != "normal":
+                        raise UnsupportedXlsxError(f"不支持的公式类型: {formula_type}")
+                elif data_type == "inlineStr":
+                    inline = cell.find(_INLINE_TAG)
+                    value = _text_content(inline) if inline is not None else None
+                else:
+                    value = cell.findtext(_VALUE_TAG) or None
+                    if value is not None:
+                        if data_type == "n":
+                            value = _cast_number(value)
+                            style = cell.get("s")
+                            if style and int(style) in date_styles:
+                                style_id = int(style)
+                                try:
+                                    value = from_excel(
+                                        value, epoch, timedelta=style_id in timedelta_styles
+                                    )
+                                except (OverflowError, ValueError):
+                                    value = "#VALUE!"
+                        elif data_type == "s":
+                            value = shared_strings[int(value)]
+                        elif data_type == "b":
+                            value = bool(int(value))
+                        elif data_type == "d":
+                            value = from_ISO8601(value)
+                
+                width = len(values)
+                if col > width:
+                    if col > width + 1:
+                        values.extend([None] * (col - width - 1))
+                    values.append(value)
+                else:
+                    values[col - 1] = value
+            
+            row.clear()
+            yield row_idx, values
@@ -0,0 +1,382 @@
+"""
+选区比较服务
+
+比较两个工作表中用户选定的矩形区域，支持按位置比较和主键列/标题行智能匹配。
+区域格式为 (min_row, min_col, max_row, max_col)，0-indexed，包含边界。
+"""
+import sys
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from src.models.excel_model import WorkbookData, SheetData
+from src.models.diff_model import DiffResult, DiffSummary, DiffType, CompareResult
+from src.services.compare_service import CompareService, CompareOptions
+
+
+class SelectionCompareService:
+    """选区比较服务"""
+    
+    @classmethod
+    def compare(
+        cls,
+        workbook_a: WorkbookData,
+        workbook_b: WorkbookData,
+        sheet_name: str,
+        range_a: Tuple[int, int, int, int],
+        range_b: Tuple[int, int, int, int],
+        key_col1: Optional[int],
+        key_col2: Optional[int],
+        header_row: Optional[int],
+        options: CompareOptions,
+        external_header_row: Optional[int] = None,
+        progress_cb: Optional[Callable[[int, str], None]] = None
+    ) -> CompareResult:
+        """
+        比较两个选区
+        
+        指定了主键列、选区内标题行或外部标题行时使用智能匹配，否则按位置比较。
+        
+        Args:
+            workbook_a: 第一个工作簿
+            workbook_b: 第二个工作簿
+            sheet_name: 工作表名称（两个工作簿中都必须存在）
+            range_a: 文件A的选区
+            range_b: 文件B的选区（列数必须与A相同）
+            key_col1, key_col2: 主键列（相对于选区起始列的偏移）
+            header_row: 选区内标题行（相对于选区起始行的偏移）
+            options: 比较选项
+            external_header_row: 选区外标题行的绝对行索引
+            progress_cb: 进度回调 (百分比 0-100, 消息)
+            
+        Returns:
+            CompareResult 对象
+        """
+        sheet_a = workbook_a.get_sheet(sheet_name)
+        sheet_b = workbook_b.get_sheet(sheet_name)
+        if not sheet_a or not sheet_b:
+            raise ValueError(f"工作表 '{sheet_name}' 不存在")
+        
+        if key_col1 is not None or header_row is not None or external_header_row is not None:
+            diffs = cls.compare_smart(
+                sheet_name, sheet_a, sheet_b,
+                range_a, range_b, key_col1, key_col2, header_row, options,
+                external_header_row=external_header_row,
+                progress_cb=progress_cb
+            )
+        else:
+            diffs = cls.compare_by_position(
+                sheet_name, sheet_a, sheet_b,
+                range_a, range_b, options,
+                progress_cb=progress_cb
+            )
+        
+        summary = DiffSummary()
+        for diff in diffs:
+            summary.add_diff(diff.diff_type)
+        
+        return CompareResult(
+            file_a=workbook_a.file_name,
+            file_b=workbook_b.file_name,
+            diffs=diffs,
+            summary=summary
+        )
+    
+    @classmethod
+    def compare_smart(
+        cls,
+        sheet_name: str,
+        sheet_a: SheetData,
+        sheet_b: SheetData,
+        range_a: Tuple[int, int, int, int],
+        range_b: Tuple[int, int, int, int],
+        key_col1: Optional[int],
+        key_col2: Optional[int],
+        header_row: Optional[int],
+        options: CompareOptions,
+        external_header_row: Optional[int] = None,
+        progress_cb: Optional[Callable[[int, str], None]] = None
+    ) -> List[DiffResult]:
+        """选区智能比较（支持复合主键列匹配行 + 标题行匹配列）
+
+        Args:
+            key_col1, key_col2: 主键列（相对于选区起始列的偏移）
+            header_row: 选区内标题行（相对于选区起始行的偏移）
+            external_header_row: 外部标题行的绝对行索引，用于标题行不在选区内的情况
+            progress_cb: 进度回调 (百分比 0-100, 消息)
+        """
+
+        # 热路径中频繁使用的名称绑定为局部变量，差异按位置参数构造
+        DR = DiffResult
+        ADDED = DiffType.ADDED
+        DELETED = DiffType.DELETED
+        get_diff_type = CompareService.get_diff_type
+
+        diffs = []
+        append = diffs.append
+        extend = diffs.extend
+
+        normalize_values = CompareService.normalize_values
+
+        # 选区内标题行（两个选区都包含该行时有效）及其之前的行不参与数据比较
+        height_a = range_a[2] - range_a[0] + 1
+        height_b = range_b[2] - range_b[0] + 1
+        use_inner_header = (
+            external_header_row is None and header_row is not None
+            and header_row < height_a and header_row < height_b
+        )
+        data_start_offset = header_row + 1 if use_inner_header else 0
+
+        # 主键列匹配行时，按单/复合主键和是否忽略大小写预先生成专用的主键函数，逐行调用时不再判断
+        make_key = cls._key_builder(key_col1, key_col2, options.ignore_case) if key_col1 is not None else None
+
+        def scan_range(sheet, rng):
+            """
+            单遍扫描选区：取出标题行，按忽略选项标准化数据行，并按主键分组
+
+            Returns:
+                (标题行值, 数据行列表, 主键分组, 标准化后的行)。
+                数据行为 [(行号, 行值)]，只在不按主键匹配时收集；
+                标准化后的行按行号索引，逐单元格比较时直接用 != 判断
+            """
+            header_values = None
+            data_rows = []
+            groups = defaultdict(list)
+            norm_rows = {}
+            for offset, row_data in enumerate(sheet.iter_range_values(*rng)):
+                if offset < data_start_offset:
+                    if offset == header_row:
+                        header_values = row_data
+                    continue
+                row_idx = rng[0] + offset
+                norm_rows[row_idx] = normalize_values(row_data, options)
+                if make_key is None:
+                    data_rows.append((row_idx, row_data))
+                else:
+                    norm_key = make_key(row_data)
+                    if norm_key:
+                        groups[norm_key].append((row_idx, row_data))
+            return header_values, data_rows, groups, norm_rows
+
+        header_row_a, data_a, rows_a, norm_a = scan_range(sheet_a, range_a)
+        header_row_b, data_b, rows_b, norm_b = scan_range(sheet_b, range_b)
+
+        # 构建列映射（标题行匹配列）
+        col_map_a_to_b = {}  # A的相对列索引 -> B的相对列索引
+
+        # 处理外部标题行（不占用选区行）
+        if external_header_row is not None:
+            # 从工作表读取标题行
+            header_values_a = sheet_a.get_range_values(
+                external_header_row, range_a[1], external_header_row, range_a[3]
+            )[0]
+            header_values_b = sheet_b.get_range_values(
+                external_header_row, range_b[1], external_header_row, range_b[1] + len(header_values_a) - 1
+            )[0]
+            headers_a = cls._header_columns(header_values_a)
+            headers_b = cls._header_columns(header_values_b)
+        elif use_inner_header:
+            headers_a = cls._header_columns(header_row_a)
+            headers_b = cls._header_columns(header_row_b)
+        else:
+            headers_a = headers_b = {}
+
+        for header, col_a in headers_a.items():
+            if header in headers_b:
+                col_map_a_to_b[col_a] = headers_b[header]
+        
+        if key_col1 is not None:
+            # 主键列匹配行（支持复合主键），主键列不使用列映射，始终从指定的列索引提取
+            all_keys = set(rows_a.keys()) | set(rows_b.keys())
+
+            # 需要比较的列对（按列映射或按位置，去掉主键列），预先拆成两个并行列表。
+            # 选区的每行都是完整宽度，列索引不会越界
+            if col_map_a_to_b:
+                col_pairs = list(col_map_a_to_b.items())
+            else:
+                col_pairs = [(col, col) for col in range(range_a[3] - range_a[1] + 1)]
+            col_pairs = [(col_a, col_b) for col_a, col_b in col_pairs if col_a != key_col1 and col_a != key_col2]
+            cols_a = [col_a for col_a, _ in col_pairs]
+            cols_b = [col_b for _, col_b in col_pairs]
+            col_start_a = range_a[1]
+            col_start_b = range_b[1]
+            
+            for key_idx, key in enumerate(all_keys):
+                if progress_cb and key_idx % CompareService.PROGRESS_INTERVAL == 0:
+                    progress_cb(key_idx * 100 // len(all_keys), "正在比较选区...")
+                
+                list_a = rows_a.get(key, [])
+                list_b = rows_b.get(key, [])
+                
+                # 贪婪匹配：按位置距离最小的优先匹配
+                matches, unmatched_a, unmatched_b = CompareService.match_rows_by_distance(list_a, list_b)
+                
+                # 处理匹配的行：先找出不同的列，再只为这些列构造差异
+                for (row_idx_a, row_data_a), (row_idx_b, row_data_b) in matches:
+                    norm_row_a = norm_a[row_idx_a]
+                    norm_row_b = norm_b[row_idx_b]
+                    if not col_map_a_to_b and norm_row_a == norm_row_b:
+                        continue  # 按位置比较且整行相同，无差异
+
+                    # 第一遍：不同的单元格（标准化后的值已包含忽略空白的处理）
+                    diff_cells = [
+                        (col_a, col_b, row_data_a[col_a], row_data_b[col_b])
+                        for col_a, col_b in zip(cols_a, cols_b)
+                        if norm_row_a[col_a] != norm_row_b[col_b]
+                    ]
+
+                    # 第二遍：批量构造差异结果
+                    if diff_cells:
+                        extend([
+                            DR(sheet_name, row_idx_a, col_start_a + col_a, get_diff_type(val_a, val_b),
+                               val_a, val_b, row_idx_b, col_start_b + col_b)
+                            for col_a, col_b, val_a, val_b in diff_cells
+                        ])
+                
+                # 处理未匹配的A（删除）和B（新增），非空单元格批量构造后一次性追加
+                if unmatched_a:
+                    extend([
+                        DR(sheet_name, row_idx_a, col_start_a + col_offset, DELETED, val)
+                        for row_idx_a, row_data_a in unmatched_a
+                        for col_offset, val in enumerate(row_data_a)
+                        if val is not None and str(val).strip() != ""
+                    ])
+                if unmatched_b:
+                    extend([
+                        DR(sheet_name, row_idx_b, col_start_b + col_offset, ADDED,
+                           None, val, row_idx_b, col_start_b + col_offset)
+                        for row_idx_b, row_data_b in unmatched_b
+                        for col_offset, val in enumerate(row_data_b)
+                        if val is not None and str(val).strip() != ""
+                    ])
+        else:
+            # 只使用首行匹配列，按位置匹配行（数据行从标题行之后开始）
+            max_rows = max(len(data_a), len(data_b))
+            for i in range(max_rows):
+                if progress_cb and i % CompareService.PROGRESS_INTERVAL == 0:
+                    progress_cb(i * 100 // max_rows, "正在比较选区...")
+                row_idx_a, row_data_a = data_a[i] if i < len(data_a) else (range_a[0] + data_start_offset + i, [])
+                row_idx_b, row_data_b = data_b[i] if i < len(data_b) else (range_b[0] + data_start_offset + i, [])
+                norm_row_a = norm_a.get(row_idx_a, row_data_a)
+                norm_row_b = norm_b.get(row_idx_b, row_data_b)
+                
+                if col_map_a_to_b:
+                    for col_a, col_b in col_map_a_to_b.items():
+                        cmp_a = norm_row_a[col_a] if col_a < len(row_data_a) else None
+                        cmp_b = norm_row_b[col_b] if col_b < len(row_data_b) else None
+                        if cmp_a != cmp_b:
+                            val_a = row_data_a[col_a] if col_a < len(row_data_a) else None
+                            val_b = row_data_b[col_b] if col_b < len(row_data_b) else None
+                            diff_type = get_diff_type(val_a, val_b)
+                            append(DR(
+                                sheet_name, row_idx_a, range_a[1] + col_a, diff_type,
+                                val_a, val_b, row_idx_b, range_b[1] + col_b
+                            ))
+        
+        return diffs
+    
+    @staticmethod
+    def _key_builder(
+        col1: int,
+        col2: Optional[int],
+        ignore_case: bool
+    ) -> Callable[[List[Any]], Optional[str]]:
+        """
+        生成主键函数：row_data -> 主键（主键列为空时返回 None）
+        
+        单列主键和复合主键分别生成闭包，ignore_case 在生成时确定，
+        逐行构建主键时没有多余的分支判断。复合主键的第二列为空时只取第一列。
+        """
+        if col2 is None:
+            def make_key(row_data):
+                val1 = row_data[col1] if col1 < len(row_data) else None
+                if val1 is None:
+                    return None
+                key = str(val1).strip()
+                if not key:
+                    return None
+                return key.lower() if ignore_case else key
+            return make_key
+        
+        def make_composite_key(row_data):
+            val1 = row_data[col1] if col1 < len(row_data) else None
+            if val1 is None:
+                return None
+            key = str(val1).strip()
+            if not key:
+                return None
+            val2 = row_data[col2] if col2 < len(row_data) else None
+            if val2 is not None:
+                key2 = str(val2).strip()
+                if key2:
+                    key = f"{key}|{key2}"
+            return key.lower() if ignore_case else key
+        return make_composite_key
+    
+    @staticmethod
+    def _header_columns(header_values: List[Any]) -> Dict[str, int]:
+        """
+        建立标题 -> 列偏移的映射（标题匹配始终忽略大小写，空标题跳过，重名时取最后一列）
+        
+        标题键经 sys.intern 驻留，A、B 两边相同的标题在后续字典查找时按指针比较即可命中。
+        """
+        headers = {}
+        for col_offset, val in enumerate(header_values):
+            if val is None:
+                continue
+            text = str(val).strip()
+            if text:
+                headers[sys.intern(text.lower())] = col_offset
+        return headers
+    
+    @classmethod
+    def compare_by_position(
+        cls,
+        sheet_name: str,
+        sheet_a: SheetData,
+        sheet_b: SheetData,
+        range_a: Tuple[int, int, int, int],
+        range_b: Tuple[int, int, int, int],
+        options: CompareOptions,
+        progress_cb: Optional[Callable[[int, str], None]] = None
+    ) -> List[DiffResult]:
+        """按位置比较选区"""
+
+        # 热路径中频繁使用的名称绑定为局部变量，差异按位置参数构造
+        DR = DiffResult
+        get_diff_type = CompareService.get_diff_type
+        
+        diffs = []
+        extend = diffs.extend
+        rows = range_a[2] - range_a[0] + 1
+        cols = range_a[3] - range_a[1] + 1
+        col_start_a = range_a[1]
+        col_start_b = range_b[1]
+        
+        # 两个选区按相同大小逐行取值（以A选区大小为准），同步推进不整体物化
+        values_a = sheet_a.iter_range_values(*range_a)
+        values_b = sheet_b.iter_range_values(
+            range_b[0], range_b[1], range_b[0] + rows - 1, range_b[1] + cols - 1
+        )
+        
+        for row_offset, (row_values_a, row_values_b) in enumerate(zip(values_a, values_b)):
+            if progress_cb and row_offset % CompareService.PROGRESS_INTERVAL == 0:
+                progress_cb(row_offset * 100 // rows, "正在比较选区...")
+            row_a = range_a[0] + row_offset
+            row_b = range_b[0] + row_offset
+            # 按忽略选项预先标准化整行，逐单元格直接用 != 判断
+            norm_row_a = CompareService.normalize_values(row_values_a, options)
+            norm_row_b = CompareService.normalize_values(row_values_b, options)
+            if norm_row_a == norm_row_b:
+                continue  # 整行相同（C 层面的列表比较），无需逐单元格检查
+            # 只对不同的列批量构造差异
+            diff_cells = [
+                (col_offset, row_values_a[col_offset], row_values_b[col_offset])
+                for col_offset, (cmp_a, cmp_b) in enumerate(zip(norm_row_a, norm_row_b))
+                if cmp_a != cmp_b
+            ]
+            extend([
+                DR(sheet_name, row_a, col_start_a + col_offset, get_diff_type(val_a, val_b),
+                   val_a, val_b, row_b, col_start_b + col_offset)
+                for col_offset, val_a, val_b in diff_cells
+            ])
+        return diffs
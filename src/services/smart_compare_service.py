@@ -5,10 +5,10 @@
 """
 import re
 from dataclasses import dataclass
-from typing import List, Optional, Dict, Any, Tuple
+from typing import Callable, List, Optional, Dict, Any, Tuple
 
 from src.models.excel_model import WorkbookData, SheetData, CellData
-from src.models.diff_model import DiffResult, DiffSummary, DiffType, CompareResult
+from src.models.diff_model import DiffResult, DiffSummary, DiffType, CompareResult, col_to_letter, letter_to_col
 
 
 @dataclass
@@ -44,19 +44,12 @@ class CellRange:
     @staticmethod
     def _col_to_index(col_str: str) -> int:
         """列字母转索引（A=0, B=1, ..., Z=25, AA=26）"""
-        result = 0
-        for char in col_str:
-            result = result * 26 + (ord(char) - ord('A') + 1)
-        return result - 1
+        return letter_to_col(col_str)
     
     @staticmethod
     def _index_to_col(index: int) -> str:
         """索引转列字母"""
-        result = ""
-        while index >= 0:
-            result = chr(index % 26 + ord('A')) + result
-            index = index // 26 - 1
-        return result
+        return col_to_letter(index)
     
     @property
     def row_count(self) -> int:
@@ -98,7 +91,8 @@ class SmartCompareService:
         workbook_a: WorkbookData,
         workbook_b: WorkbookData,
         sheet_name: str,
-        options: SmartCompareOptions
+        options: SmartCompareOptions,
+        progress_cb: Optional[Callable[[int, str], None]] = None
     ) -> CompareResult:
         """
         使用指定区域和智能匹配进行比较
@@ -108,6 +102,7 @@ class SmartCompareService:
             workbook_b: 工作簿 B
             sheet_name: 要比较的工作表名称
             options: 智能比较选项
+            progress_cb: 进度回调 (百分比 0-100, 消息)
             
         Returns:
             CompareResult 对象
@@ -128,10 +123,14 @@ class SmartCompareService:
         col_offset_b = options.range_b.start_col if options.range_b else 0
         
         # 提取区域数据
+        if progress_cb:
+            progress_cb(0, "正在读取区域数据...")
         data_a = cls._extract_range_data(sheet_a, options.range_a)
         data_b = cls._extract_range_data(sheet_b, options.range_b)
         
         # 根据选项选择比较方式
+        if progress_cb:
+            progress_cb(50, "正在智能匹配...")
         if options.use_key_column:
             # 基于主键列的智能匹配
             diffs = cls._compare_by_key(
@@ -14,6 +14,7 @@ from PyQt6.QtCore import Qt, pyqtSignal
 from PyQt6.QtGui import QCursor
 
 from src.services.compare_service import CompareMode, CompareOptions
+from src.models.diff_model import letter_to_col
 
 
 class ConfigPanel(QFrame):
@@ -451,12 +452,9 @@ class ConfigPanel(QFrame):
                 return None
             if key_str.isdigit():
                 return int(key_str) - 1
-            else:
-                col_idx = 0
-                for char in key_str:
-                    if 'A' <= char <= 'Z':
-                        col_idx = col_idx * 26 + (ord(char) - ord('A') + 1)
-                return col_idx - 1 if col_idx > 0 else None
+            # 只取其中的字母（如 "A1" 按 A 列处理），没有字母时视为未指定
+            letters = "".join(char for char in key_str if 'A' <= char <= 'Z')
+            return letter_to_col(letters) if letters else None
 
         # A文件主键列
         key_col1_a = parse_col(self.global_key_col_input.text())
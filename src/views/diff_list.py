@@ -5,19 +5,22 @@
 """
 from typing import List
 from PyQt6.QtWidgets import (
-    QWidget, QVBoxLayout, QLabel, QTableWidget, QTableWidgetItem,
-    QHeaderView, QFrame, QAbstractItemView
+    QVBoxLayout, QLabel, QTableView, QHeaderView, QFrame, QAbstractItemView
 )
-from PyQt6.QtCore import Qt, pyqtSignal
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex, pyqtSignal
 from PyQt6.QtGui import QColor, QBrush
 
 from src.models.diff_model import DiffResult, DiffType
 
 
-class DiffListPanel(QFrame):
-    """差异列表面板"""
+# 原值/新值列显示的最大字符数（截断过长内容）
+VALUE_DISPLAY_LIMIT = 100
+
+
+class DiffListModel(QAbstractTableModel):
+    """差异列表数据模型（只在绘制可见行时按需生成文本）"""
     
-    diff_selected = pyqtSignal(int)  # 差异选中信号（索引）
+    HEADERS = ["序号", "工作表", "位置", "类型", "原值", "新值"]
     
     # 差异类型背景色
     TYPE_COLORS = {
@@ -27,6 +30,70 @@ class DiffListPanel(QFrame):
         DiffType.FORMAT_CHANGED: QColor("#ffe0b2"),
     }
     
+    # 居中显示的列：序号、位置、类型
+    CENTERED_COLUMNS = frozenset((0, 2, 3))
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._rows: List[DiffResult] = []
+        self._type_brushes = {
+            diff_type: QBrush(color) for diff_type, color in self.TYPE_COLORS.items()
+        }
+    
+    def set_diffs(self, diffs: List[DiffResult]):
+        self.beginResetModel()
+        self._rows = diffs
+        self.endResetModel()
+    
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._rows)
+    
+    def columnCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.HEADERS)
+    
+    def data(self, index: QModelIndex, role: int = Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        
+        row, col = index.row(), index.column()
+        
+        if role == Qt.ItemDataRole.DisplayRole:
+            diff = self._rows[row]
+            if col == 0:
+                return str(row + 1)
+            elif col == 1:
+                return diff.sheet
+            elif col == 2:
+                return diff.position
+            elif col == 3:
+                return diff.type_display
+            value = diff.old_value if col == 4 else diff.new_value
+            return str(value)[:VALUE_DISPLAY_LIMIT] if value is not None else ""
+        
+        elif role == Qt.ItemDataRole.TextAlignmentRole:
+            if col in self.CENTERED_COLUMNS:
+                return Qt.AlignmentFlag.AlignCenter
+        
+        elif role == Qt.ItemDataRole.BackgroundRole:
+            if col == 3:
+                return self._type_brushes.get(self._rows[row].diff_type)
+        
+        return None
+    
+    def headerData(self, section: int, orientation: Qt.Orientation, role: int = Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        
+        if orientation == Qt.Orientation.Horizontal:
+            return self.HEADERS[section]
+        return None
+
+
+class DiffListPanel(QFrame):
+    """差异列表面板"""
+    
+    diff_selected = pyqtSignal(int)  # 差异选中信号（索引）
+    
     def __init__(self, parent=None):
         super().__init__(parent)
         self._diffs: List[DiffResult] = []
@@ -44,34 +111,37 @@ class DiffListPanel(QFrame):
         title.setObjectName("panelTitle")
         layout.addWidget(title)
         
-        # 表格
-        self.table = QTableWidget()
-        self.table.setColumnCount(6)
-        self.table.setHorizontalHeaderLabels([
-            "序号", "工作表", "位置", "类型", "原值", "新值"
-        ])
+        # 表格（模型/视图，只绘制可见行，不为每个差异创建单元格对象）
+        self.model = DiffListModel(self)
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        self.table.verticalHeader().setVisible(False)
         
-        # 设置列宽
+        # 设置列宽（不使用按内容调整，避免每次刷新扫描所有行计算列宽）
         header = self.table.horizontalHeader()
         header.setSectionResizeMode(0, QHeaderView.ResizeMode.Fixed)
-        header.setSectionResizeMode(1, QHeaderView.ResizeMode.ResizeToContents)
+        header.setSectionResizeMode(1, QHeaderView.ResizeMode.Interactive)
         header.setSectionResizeMode(2, QHeaderView.ResizeMode.Fixed)
         header.setSectionResizeMode(3, QHeaderView.ResizeMode.Fixed)
         header.setSectionResizeMode(4, QHeaderView.ResizeMode.Stretch)
         header.setSectionResizeMode(5, QHeaderView.ResizeMode.Stretch)
         
         self.table.setColumnWidth(0, 50)
+        self.table.setColumnWidth(1, 100)
         self.table.setColumnWidth(2, 60)
         self.table.setColumnWidth(3, 80)
         
+        # 固定行高，滚动时无需逐行计算高度
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        
         # 设置行为
         self.table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
         self.table.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
         self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
         self.table.setAlternatingRowColors(True)
         
-        # 连接信号
-        self.table.itemSelectionChanged.connect(self._on_selection_changed)
+        # 连接信号（选择模型在 setModel 之后才可用）
+        self.table.selectionModel().selectionChanged.connect(self._on_selection_changed)
         
         layout.addWidget(self.table)
     
@@ -88,7 +158,7 @@ class DiffListPanel(QFrame):
                 font-weight: bold;
                 color: #333333;
             }
-            QTableWidget {
+            QTableView {
                 border: 1px solid #e0e0e0;
                 border-radius: 4px;
                 gridline-color: #e0e0e0;
@@ -102,50 +172,18 @@ class DiffListPanel(QFrame):
         """)
     
     def set_diffs(self, diffs: List[DiffResult]):
-        """设置差异列表"""
+        """设置差异列表（只重置模型，不逐行创建单元格）"""
         self._diffs = diffs
-        self.table.setRowCount(len(diffs))
-        
-        for i, diff in enumerate(diffs):
-            # 序号
-            item_idx = QTableWidgetItem(str(i + 1))
-            item_idx.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-            self.table.setItem(i, 0, item_idx)
-            
-            # 工作表
-            item_sheet = QTableWidgetItem(diff.sheet)
-            self.table.setItem(i, 1, item_sheet)
-            
-            # 位置
-            item_pos = QTableWidgetItem(diff.position)
-            item_pos.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-            self.table.setItem(i, 2, item_pos)
-            
-            # 类型
-            item_type = QTableWidgetItem(diff.type_display)
-            item_type.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-            item_type.setBackground(QBrush(self.TYPE_COLORS.get(diff.diff_type, QColor("#ffffff"))))
-            self.table.setItem(i, 3, item_type)
-            
-            # 原值
-            old_val = str(diff.old_value) if diff.old_value is not None else ""
-            item_old = QTableWidgetItem(old_val[:100])  # 截断过长内容
-            self.table.setItem(i, 4, item_old)
-            
-            # 新值
-            new_val = str(diff.new_value) if diff.new_value is not None else ""
-            item_new = QTableWidgetItem(new_val[:100])
-            self.table.setItem(i, 5, item_new)
+        self.model.set_diffs(diffs)
     
     def _on_selection_changed(self):
         """选中变化"""
-        selected = self.table.selectedItems()
+        selected = self.table.selectionModel().selectedRows()
         if selected:
-            row = selected[0].row()
-            self.diff_selected.emit(row)
+            self.diff_selected.emit(selected[0].row())
     
     def select_diff(self, index: int):
         """选中指定差异"""
-        if 0 <= index < self.table.rowCount():
+        if 0 <= index < self.model.rowCount():
             self.table.selectRow(index)
-            self.table.scrollToItem(self.table.item(index, 0))
+            self.table.scrollTo(self.model.index(index, 0))
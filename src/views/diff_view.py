@@ -4,17 +4,27 @@
 
 双栏表格显示，支持鼠标拖拽选择区域。
 """
+from collections import defaultdict
 from typing import Optional, List, Dict, Tuple
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QTabWidget, QTableView,
     QHeaderView, QLabel, QAbstractItemView, QPushButton, QFrame,
-    QCheckBox, QLineEdit
+    QCheckBox, QLineEdit, QScrollBar
 )
 from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex, pyqtSignal
 from PyQt6.QtGui import QBrush, QColor
 
-from src.models.excel_model import WorkbookData, SheetData
-from src.models.diff_model import DiffResult, DiffType
+from src.models.excel_model import WorkbookData, SheetData, CellData
+from src.models.diff_model import DiffResult, DiffType, col_to_letter
+
+
+# 单元格位置键（差异映射、单元格缓存共用）：(row << DIFF_KEY_SHIFT) | col
+# 列占 20 位（最多 1048576 列，远超 Excel 的 16384 列上限），用整数键代替 (row, col) 元组，
+# 避免每次绘制单元格时分配元组
+DIFF_KEY_SHIFT = 20
+
+# 单元格缓存上限（约为一屏可见单元格数量）
+CELL_CACHE_SIZE = 4096
 
 
 class SheetTableModel(QAbstractTableModel):
@@ -30,14 +40,29 @@ class SheetTableModel(QAbstractTableModel):
     def __init__(self, parent=None):
         super().__init__(parent)
         self._sheet: Optional[SheetData] = None
-        self._diff_map: Dict[Tuple[int, int], DiffType] = {}
+        self._diff_map: Dict[int, DiffType] = {}
+        # Qt 每次重绘会按 DisplayRole / ToolTipRole 等多次调用 data()，
+        # 缓存单元格查找结果，避免同一单元格重复 get_cell
+        self._cell_cache: Dict[int, Optional[CellData]] = {}
     
-    def set_data(self, sheet: SheetData, diff_map: Dict[Tuple[int, int], DiffType]):
+    def set_data(self, sheet: SheetData, diff_map: Dict[int, DiffType]):
         self.beginResetModel()
         self._sheet = sheet
         self._diff_map = diff_map
+        self._cell_cache.clear()
         self.endResetModel()
     
+    def _get_cell(self, key: int, row: int, col: int) -> Optional[CellData]:
+        """获取单元格（带缓存）"""
+        cache = self._cell_cache
+        cell = cache.get(key)
+        if cell is None and key not in cache:
+            cell = self._sheet.get_cell(row, col)
+            if len(cache) >= CELL_CACHE_SIZE:
+                cache.clear()
+            cache[key] = cell
+        return cell
+    
     def rowCount(self, parent=QModelIndex()) -> int:
         return self._sheet.row_count if self._sheet else 0
     
@@ -49,18 +74,19 @@ class SheetTableModel(QAbstractTableModel):
             return None
         
         row, col = index.row(), index.column()
+        key = (row << DIFF_KEY_SHIFT) | col
         
         if role == Qt.ItemDataRole.DisplayRole:
-            cell = self._sheet.get_cell(row, col)
+            cell = self._get_cell(key, row, col)
             return cell.display_value if cell else ""
         
         elif role == Qt.ItemDataRole.BackgroundRole:
-            diff_type = self._diff_map.get((row, col))
+            diff_type = self._diff_map.get(key)
             if diff_type:
                 return QBrush(self.DIFF_COLORS.get(diff_type, QColor("#ffffff")))
         
         elif role == Qt.ItemDataRole.ToolTipRole:
-            cell = self._sheet.get_cell(row, col)
+            cell = self._get_cell(key, row, col)
             if cell and cell.value is not None:
                 tip = f"值: {cell.value}"
                 if cell.formula:
@@ -74,17 +100,9 @@ class SheetTableModel(QAbstractTableModel):
             return None
         
         if orientation == Qt.Orientation.Horizontal:
-            return self._col_to_letter(section)
+            return col_to_letter(section)
         else:
             return str(section + 1)
-    
-    @staticmethod
-    def _col_to_letter(col: int) -> str:
-        result = ""
-        while col >= 0:
-            result = chr(col % 26 + ord('A')) + result
-            col = col // 26 - 1
-        return result
 
 
 class SelectableTableView(QTableView):
@@ -112,6 +130,14 @@ class SelectableTableView(QTableView):
 
         self.selectionModel()
 
+        # 当前选区边界 (min_row, min_col, max_row, max_col)，None 表示无选区
+        self._sel_bounds: Optional[Tuple[int, int, int, int]] = None
+
+    def reset(self):
+        """模型重置时选区会被静默清空，同步清除缓存的选区边界"""
+        super().reset()
+        self._sel_bounds = None
+
     def mousePressEvent(self, event):
         """鼠标点击事件"""
         super().mousePressEvent(event)
@@ -121,36 +147,49 @@ class SelectableTableView(QTableView):
     
     def selectionChanged(self, selected, deselected):
         super().selectionChanged(selected, deselected)
-        # 获取选中区域
-        indexes = self.selectionModel().selectedIndexes()
-        if indexes:
-            rows = [idx.row() for idx in indexes]
-            cols = [idx.column() for idx in indexes]
-            min_row, max_row = min(rows), max(rows)
-            min_col, max_col = min(cols), max(cols)
-            
+        if deselected.isEmpty() and selected.count() == 1:
+            # 只新增了一个区域：在已有边界上增量扩展，无需重新扫描整个选区
+            rng = selected[0]
+            bounds = self._sel_bounds
+            if bounds is None:
+                bounds = (rng.top(), rng.left(), rng.bottom(), rng.right())
+            else:
+                bounds = (
+                    min(bounds[0], rng.top()), min(bounds[1], rng.left()),
+                    max(bounds[2], rng.bottom()), max(bounds[3], rng.right())
+                )
+        else:
+            bounds = self._scan_selection_bounds()
+        self._sel_bounds = bounds
+        
+        if bounds:
+            min_row, min_col, max_row, max_col = bounds
             # 转换为 Excel 格式
-            range_str = f"{self._col_to_letter(min_col)}{min_row + 1}:{self._col_to_letter(max_col)}{max_row + 1}"
+            range_str = f"{col_to_letter(min_col)}{min_row + 1}:{col_to_letter(max_col)}{max_row + 1}"
             self.selection_changed.emit(range_str)
         else:
             self.selection_changed.emit("")
     
-    @staticmethod
-    def _col_to_letter(col: int) -> str:
-        result = ""
-        while col >= 0:
-            result = chr(col % 26 + ord('A')) + result
-            col = col // 26 - 1
-        return result
+    def _scan_selection_bounds(self) -> Optional[Tuple[int, int, int, int]]:
+        """按选区范围（而非逐个索引）计算选区边界"""
+        ranges = self.selectionModel().selection()
+        if ranges.isEmpty():
+            return None
+        min_row = min_col = None
+        max_row = max_col = -1
+        for rng in ranges:
+            top, left = rng.top(), rng.left()
+            if min_row is None or top < min_row:
+                min_row = top
+            if min_col is None or left < min_col:
+                min_col = left
+            max_row = max(max_row, rng.bottom())
+            max_col = max(max_col, rng.right())
+        return (min_row, min_col, max_row, max_col)
     
     def get_selection_range(self) -> Optional[Tuple[int, int, int, int]]:
         """获取选中区域 (min_row, min_col, max_row, max_col)，0-indexed"""
-        indexes = self.selectionModel().selectedIndexes()
-        if not indexes:
-            return None
-        rows = [idx.row() for idx in indexes]
-        cols = [idx.column() for idx in indexes]
-        return (min(rows), min(cols), max(rows), max(cols))
+        return self._scan_selection_bounds()
 
 
 class DiffView(QWidget):
@@ -165,6 +204,8 @@ class DiffView(QWidget):
         self._workbook_b: Optional[WorkbookData] = None
         self._diffs: List[DiffResult] = []
         self._current_tables: Dict[str, Tuple[SelectableTableView, SelectableTableView]] = {}
+        # 同步滚动的滚动条配对（双向注册：源滚动条 -> 目标滚动条）
+        self._scroll_pairs: Dict[QScrollBar, QScrollBar] = {}
         
         self._setup_ui()
         self._apply_styles()
@@ -282,40 +323,44 @@ class DiffView(QWidget):
         self._workbook_b = workbook_b
         self._diffs = diffs
         self._current_tables.clear()
+        self._scroll_pairs.clear()
         
         if not workbook_a and not workbook_b:
             return
         
         # 构建差异映射（文件A和文件B可能有不同的位置）
         # 新增(ADDED)只在B高亮，删除(DELETED)只在A高亮，修改(MODIFIED)两边都高亮
-        diff_map_a: Dict[str, Dict[Tuple[int, int], DiffType]] = {}
-        diff_map_b: Dict[str, Dict[Tuple[int, int], DiffType]] = {}
+        diff_map_a: Dict[str, Dict[int, DiffType]] = {}
+        diff_map_b: Dict[str, Dict[int, DiffType]] = {}
+        # 各工作表在文件A中的差异数量（用于标签页显示）
+        diff_counts: Dict[str, int] = defaultdict(int)
         
         for diff in diffs:
-            if diff.sheet not in diff_map_a:
-                diff_map_a[diff.sheet] = {}
-                diff_map_b[diff.sheet] = {}
+            sheet = diff.sheet
+            sheet_map_a = diff_map_a.get(sheet)
+            if sheet_map_a is None:
+                sheet_map_a = diff_map_a[sheet] = {}
+                diff_map_b[sheet] = {}
+            sheet_map_b = diff_map_b[sheet]
             
             # 根据差异类型决定高亮位置
             if diff.diff_type == DiffType.ADDED:
                 # 新增：只在文件B中高亮
                 row_b = diff.row_b if diff.row_b is not None else diff.row
                 col_b = diff.col_b if diff.col_b is not None else diff.col
-                pos_b = (row_b, col_b)
-                diff_map_b[diff.sheet][pos_b] = diff.diff_type
+                sheet_map_b[(row_b << DIFF_KEY_SHIFT) | col_b] = diff.diff_type
             elif diff.diff_type == DiffType.DELETED:
                 # 删除：只在文件A中高亮
-                pos_a = (diff.row, diff.col)
-                diff_map_a[diff.sheet][pos_a] = diff.diff_type
+                sheet_map_a[(diff.row << DIFF_KEY_SHIFT) | diff.col] = diff.diff_type
+                diff_counts[sheet] += 1
             else:
                 # 修改或格式变化：两边都高亮
-                pos_a = (diff.row, diff.col)
-                diff_map_a[diff.sheet][pos_a] = diff.diff_type
+                sheet_map_a[(diff.row << DIFF_KEY_SHIFT) | diff.col] = diff.diff_type
+                diff_counts[sheet] += 1
                 
                 row_b = diff.row_b if diff.row_b is not None else diff.row
                 col_b = diff.col_b if diff.col_b is not None else diff.col
-                pos_b = (row_b, col_b)
-                diff_map_b[diff.sheet][pos_b] = diff.diff_type
+                sheet_map_b[(row_b << DIFF_KEY_SHIFT) | col_b] = diff.diff_type
         
         self.tab_widget.clear()
         
@@ -337,7 +382,7 @@ class DiffView(QWidget):
             
             self._current_tables[sheet_name] = (table_a, table_b)
             
-            diff_count = len(diff_map_a.get(sheet_name, {}))
+            diff_count = diff_counts[sheet_name]
             tab_text = f"{sheet_name} ({diff_count})" if diff_count > 0 else sheet_name
             self.tab_widget.addTab(sheet_widget, tab_text)
         
@@ -350,8 +395,8 @@ class DiffView(QWidget):
         sheet_name: str,
         sheet_a: Optional[SheetData],
         sheet_b: Optional[SheetData],
-        diff_map_a: Dict[Tuple[int, int], DiffType],
-        diff_map_b: Dict[Tuple[int, int], DiffType]
+        diff_map_a: Dict[int, DiffType],
+        diff_map_b: Dict[int, DiffType]
     ) -> Tuple[QWidget, SelectableTableView, SelectableTableView]:
         """创建工作表视图，返回 (widget, table_a, table_b)"""
         widget = QWidget()
@@ -375,7 +420,7 @@ class DiffView(QWidget):
     def _create_table_view(
         self,
         sheet: Optional[SheetData],
-        diff_map: Dict[Tuple[int, int], DiffType],
+        diff_map: Dict[int, DiffType],
         title: str,
         which: str
     ) -> Tuple[QWidget, SelectableTableView]:
@@ -487,20 +532,23 @@ class DiffView(QWidget):
     
     def _sync_scroll(self, table_a: SelectableTableView, table_b: SelectableTableView):
         """同步两个表格的滚动"""
-        # 使用 lambda 捕获表格引用，并检查同步开关
-        def sync_h(source, target):
-            if self.sync_scroll_check.isChecked():
-                target.horizontalScrollBar().setValue(source.horizontalScrollBar().value())
-        
-        def sync_v(source, target):
-            if self.sync_scroll_check.isChecked():
-                target.verticalScrollBar().setValue(source.verticalScrollBar().value())
-        
-        # 连接信号
-        table_a.horizontalScrollBar().valueChanged.connect(lambda: sync_h(table_a, table_b))
-        table_b.horizontalScrollBar().valueChanged.connect(lambda: sync_h(table_b, table_a))
-        table_a.verticalScrollBar().valueChanged.connect(lambda: sync_v(table_a, table_b))
-        table_b.verticalScrollBar().valueChanged.connect(lambda: sync_v(table_b, table_a))
+        pairs = (
+            (table_a.horizontalScrollBar(), table_b.horizontalScrollBar()),
+            (table_a.verticalScrollBar(), table_b.verticalScrollBar()),
+        )
+        for bar_a, bar_b in pairs:
+            self._scroll_pairs[bar_a] = bar_b
+            self._scroll_pairs[bar_b] = bar_a
+            bar_a.valueChanged.connect(self._on_scroll_value_changed)
+            bar_b.valueChanged.connect(self._on_scroll_value_changed)
+    
+    def _on_scroll_value_changed(self, value: int):
+        """滚动条值变化，同步到配对的滚动条"""
+        if not self.sync_scroll_check.isChecked():
+            return
+        target = self._scroll_pairs.get(self.sender())
+        if target is not None:
+            target.setValue(value)
     
     def get_current_selections(self) -> Tuple[Optional[str], Optional[Tuple], Optional[str], Optional[Tuple]]:
         """
@@ -11,11 +11,53 @@ from PyQt6.QtCore import Qt
 from src.models.diff_model import DiffSummary
 
 
+# 统计面板样式表
+_STATS_STYLE = """
+    StatsPanel {
+        background-color: #ffffff;
+        border: 1px solid #e0e0e0;
+        border-radius: 8px;
+    }
+    #panelTitle {
+        font-size: 14px;
+        font-weight: bold;
+        color: #333333;
+    }
+    #statValue {
+        font-size: 18px;
+        font-weight: bold;
+        color: #2196f3;
+    }
+    #modifiedValue {
+        font-size: 16px;
+        font-weight: bold;
+        color: #ffc107;
+    }
+    #addedValue {
+        font-size: 16px;
+        font-weight: bold;
+        color: #4caf50;
+    }
+    #deletedValue {
+        font-size: 16px;
+        font-weight: bold;
+        color: #f44336;
+    }
+    #formatValue {
+        font-size: 16px;
+        font-weight: bold;
+        color: #ff9800;
+    }
+"""
+
+
 class StatsPanel(QFrame):
     """统计面板"""
     
     def __init__(self, parent=None):
         super().__init__(parent)
+        # 上次显示的统计值，相同结果重复设置时直接跳过
+        self._last_summary: tuple = ()
         self._setup_ui()
         self._apply_styles()
     
@@ -68,48 +110,23 @@ class StatsPanel(QFrame):
     
     def _apply_styles(self):
         """应用样式"""
-        self.setStyleSheet("""
-            StatsPanel {
-                background-color: #ffffff;
-                border: 1px solid #e0e0e0;
-                border-radius: 8px;
-            }
-            #panelTitle {
-                font-size: 14px;
-                font-weight: bold;
-                color: #333333;
-            }
-            #statValue {
-                font-size: 18px;
-                font-weight: bold;
-                color: #2196f3;
-            }
-            #modifiedValue {
-                font-size: 16px;
-                font-weight: bold;
-                color: #ffc107;
-            }
-            #addedValue {
-                font-size: 16px;
-                font-weight: bold;
-                color: #4caf50;
-            }
-            #deletedValue {
-                font-size: 16px;
-                font-weight: bold;
-                color: #f44336;
-            }
-            #formatValue {
-                font-size: 16px;
-                font-weight: bold;
-                color: #ff9800;
-            }
-        """)
+        self.setStyleSheet(_STATS_STYLE)
     
     def set_summary(self, summary: DiffSummary):
         """设置统计摘要"""
-        self.total_label.setText(str(summary.total))
-        self.modified_label.setText(str(summary.modified))
-        self.added_label.setText(str(summary.added))
-        self.deleted_label.setText(str(summary.deleted))
-        self.format_label.setText(str(summary.format_changed))
+        key = (summary.total, summary.modified, summary.added,
+               summary.deleted, summary.format_changed)
+        if key == self._last_summary:
+            return
+        self._last_summary = key
+        
+        # 五个数值同时变化，暂停刷新，只做一次布局和重绘
+        self.setUpdatesEnabled(False)
+        try:
+            self.total_label.setText(str(summary.total))
+            self.modified_label.setText(str(summary.modified))
+            self.added_label.setText(str(summary.added))
+            self.deleted_label.setText(str(summary.deleted))
+            self.format_label.setText(str(summary.format_changed))
+        finally:
+            self.setUpdatesEnabled(True)
@@ -3,15 +3,104 @@
 
 在后台执行 Excel 文件比较，避免阻塞 UI。
 """
-from typing import Optional, List
-from PyQt6.QtCore import QThread, pyqtSignal
+import filecmp
+import importlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
+from typing import Any, Callable, Dict, Optional, List, Tuple
+from PyQt6.QtCore import QRunnable, QThread, pyqtSignal
 
 from src.models.excel_model import WorkbookData
-from src.models.diff_model import CompareResult
+from src.models.diff_model import CompareResult, DiffResult, DiffSummary
 from src.services.excel_service import ExcelService
 from src.services.compare_service import CompareService, CompareMode, CompareOptions
 
 
+class _Cancelled(BaseException):
+    """
+    比较被用户取消
+    
+    与 asyncio.CancelledError 一样继承 BaseException：由进度回调抛出，
+    穿过服务层把解析错误统一包装为 ValueError 的 except Exception，直达 run()。
+    """
+
+
+# 已解析工作簿缓存的最大条目数
+WORKBOOK_CACHE_SIZE = 8
+# 已解析工作簿缓存的单元格总数上限（按各工作表行数 x 列数估算），
+# 超出时从最久未使用的条目开始淘汰；单个工作簿超过上限时不缓存
+WORKBOOK_CACHE_MAX_CELLS = 1_000_000
+
+# 已解析工作簿缓存（LRU）：(路径, 修改时间, 文件大小, 只读模式) -> (WorkbookData, 单元格数)，
+# 文件未变化时重复打开或比较不再重新解析；加载线程共用，读写加锁
+_workbook_cache: "OrderedDict[tuple, Tuple[WorkbookData, int]]" = OrderedDict()
+_workbook_cache_cells = 0
+_workbook_cache_lock = threading.Lock()
+
+
+def _workbook_cells(workbook: WorkbookData) -> int:
+    """工作簿的单元格数（各工作表行数 x 列数之和）"""
+    return sum(sheet.row_count * sheet.col_count for sheet in workbook.sheets)
+
+
+def _cache_workbook(key: tuple, workbook: WorkbookData):
+    """
+    放入已解析工作簿缓存（调用方持有 _workbook_cache_lock）
+    
+    同一路径的旧版本（文件已修改）不会再命中，一并移除；随后按条目数和单元格总数淘汰最久未使用的条目。
+    """
+    global _workbook_cache_cells
+    for cached_key in [k for k in _workbook_cache if k[0] == key[0] and k[1:3] != key[1:3]]:
+        _workbook_cache_cells -= _workbook_cache.pop(cached_key)[1]
+    
+    cells = _workbook_cells(workbook)
+    if cells > WORKBOOK_CACHE_MAX_CELLS:
+        return
+    if key in _workbook_cache:
+        _workbook_cache_cells -= _workbook_cache.pop(key)[1]
+    _workbook_cache[key] = (workbook, cells)
+    _workbook_cache_cells += cells
+    while len(_workbook_cache) > WORKBOOK_CACHE_SIZE or _workbook_cache_cells > WORKBOOK_CACHE_MAX_CELLS:
+        _workbook_cache_cells -= _workbook_cache.popitem(last=False)[1][1]
+
+
+def _load_workbook(
+    path: str,
+    read_only: bool = False,
+    progress_cb: Optional[Callable[[int, str], None]] = None
+) -> WorkbookData:
+    """加载工作簿（优先使用缓存）"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        # 文件不存在等情况交给 load_file 报告
+        return ExcelService.load_file(path, read_only=read_only, progress_cb=progress_cb)
+    
+    key = (path, st.st_mtime_ns, st.st_size, read_only)
+    with _workbook_cache_lock:
+        # 完整加载的工作簿包含单元格值，也可满足只读加载请求
+        for cached_key in (key[:3] + (False,), key) if read_only else (key,):
+            entry = _workbook_cache.get(cached_key)
+            if entry is not None:
+                _workbook_cache.move_to_end(cached_key)
+                return entry[0]
+    
+    workbook = ExcelService.load_file(path, read_only=read_only, progress_cb=progress_cb)
+    with _workbook_cache_lock:
+        _cache_workbook(key, workbook)
+    return workbook
+
+
+def _workbook_is_current(workbook: WorkbookData, path: str) -> bool:
+    """磁盘文件的大小和修改时间是否仍与工作簿加载时记录的一致"""
+    st = os.stat(path)
+    return st.st_size == workbook.file_size and st.st_mtime_ns == workbook.mtime_ns
+
+
 class CompareWorker(QThread):
     """比较工作线程"""
     
@@ -19,8 +108,12 @@ class CompareWorker(QThread):
     progress_updated = pyqtSignal(int, str)         # 进度更新 (百分比, 消息)
     file_loaded = pyqtSignal(str, object)           # 文件加载完成 (路径, WorkbookData)
     compare_finished = pyqtSignal(object)           # 比较完成 (CompareResult)
+    compare_cancelled = pyqtSignal()                # 比较已取消
     error_occurred = pyqtSignal(str)                # 发生错误 (错误消息)
     
+    # 中间进度信号的最小发送间隔（毫秒，约 30 Hz），更密的更新合并掉，避免跨线程信号队列堆积
+    PROGRESS_THROTTLE_MS = 33
+    
     def __init__(self, parent=None):
         super().__init__(parent)
         self.file_a_path: Optional[str] = None
@@ -29,14 +122,49 @@ class CompareWorker(QThread):
         self.options: Optional[CompareOptions] = None
         self.selected_sheets: Optional[List[str]] = None
         
+        # 智能匹配设置（None 表示使用标准比较）
+        self.key_cols_a: Optional[Tuple[Optional[int], Optional[int]]] = None
+        self.key_cols_b: Optional[Tuple[Optional[int], Optional[int]]] = None
+        self.header_row: Optional[int] = None
+        self.use_smart_match: bool = False
+        self.sheet_cache: Optional[Dict[tuple, List[DiffResult]]] = None
+        
+        # 自定义比较任务 (函数, 位置参数, 关键字参数)，设置后替代工作簿比较
+        self._task: Optional[Tuple[Callable[..., CompareResult], tuple, Dict[str, Any]]] = None
+        
         self._workbook_a: Optional[WorkbookData] = None
         self._workbook_b: Optional[WorkbookData] = None
+        
+        # 上次发送进度信号的时间（单调时钟，纳秒），加载阶段可能由两个加载线程同时更新
+        self._last_progress_ns = 0
+        
+        # 文件加载进度（A、B 各自的百分比），可能由两个加载线程同时更新
+        self._load_percents = [0, 0]
+        # 并行加载中一个文件已失败，另一个在下一次进度回调时停止
+        self._load_aborted = False
+    
+    def cancel(self):
+        """请求取消（加载或比较在下一次进度回调时停止，随后发送 compare_cancelled）"""
+        self.requestInterruption()
     
     def set_files(self, file_a: str, file_b: str):
         """设置要比较的文件"""
         self.file_a_path = file_a
         self.file_b_path = file_b
     
+    def set_workbooks(self, workbook_a: Optional[WorkbookData], workbook_b: Optional[WorkbookData]):
+        """
+        设置已加载的工作簿（跳过文件加载步骤）
+        
+        传入 None 的一侧在比较前按 set_files 设置的路径重新加载。
+        """
+        self._workbook_a = workbook_a
+        self._workbook_b = workbook_b
+        if workbook_a is not None:
+            self.file_a_path = workbook_a.file_path
+        if workbook_b is not None:
+            self.file_b_path = workbook_b.file_path
+    
     def set_compare_options(
         self, 
         mode: CompareMode = CompareMode.EXACT,
@@ -48,62 +176,264 @@ class CompareWorker(QThread):
         self.options = options or CompareOptions()
         self.selected_sheets = selected_sheets
     
+    def set_smart_match(
+        self,
+        key_cols_a: Tuple[Optional[int], Optional[int]],
+        key_cols_b: Tuple[Optional[int], Optional[int]],
+        header_row: Optional[int],
+        sheet_cache: Optional[Dict[tuple, List[DiffResult]]] = None
+    ):
+        """设置智能匹配（主键列匹配行 / 标题行匹配列），可传入工作表级结果缓存"""
+        self.key_cols_a = key_cols_a
+        self.key_cols_b = key_cols_b
+        self.header_row = header_row
+        self.sheet_cache = sheet_cache
+        self.use_smart_match = True
+    
+    def set_task(self, func: Callable[..., CompareResult], *args, **kwargs):
+        """
+        设置自定义比较任务（如选区比较、区域智能比较），在线程中执行
+        
+        func 需接受 progress_cb 关键字参数（进度回调）并返回 CompareResult。
+        """
+        self._task = (func, args, kwargs)
+    
     def run(self):
         """执行比较任务"""
         try:
-            # 1. 加载文件 A
-            self.progress_updated.emit(10, "正在加载文件 A...")
-            self._workbook_a = ExcelService.load_file(self.file_a_path)
-            self.file_loaded.emit(self.file_a_path, self._workbook_a)
+            if self._task is not None:
+                func, args, kwargs = self._task
+                self._start_progress("正在比较...")
+                result = func(*args, progress_cb=self._on_compare_progress, **kwargs)
+                self._emit_progress(100, "比较完成", force=True)
+                self.compare_finished.emit(result)
+                return
+            
+            # 忽略格式时只需要单元格值，使用只读流式加载（不解析样式）
+            read_only = self.options is not None and self.options.ignore_format
+            
+            # 1. 加载文件（两个文件都需要加载时并行解析），进度映射到 10-50 区间
+            self._load_percents = [
+                0 if self._workbook_a is None else 100,
+                0 if self._workbook_b is None else 100,
+            ]
+            if self._workbook_a is None and self._workbook_b is None:
+                self._load_both(read_only)
+            
+            if self._workbook_a is None:
+                self._emit_progress(10, "正在加载文件 A...", force=True)
+                self._workbook_a = _load_workbook(
+                    self.file_a_path, read_only, partial(self._on_load_progress, 0)
+                )
+                self.file_loaded.emit(self.file_a_path, self._workbook_a)
             
-            # 2. 加载文件 B
-            self.progress_updated.emit(30, "正在加载文件 B...")
-            self._workbook_b = ExcelService.load_file(self.file_b_path)
-            self.file_loaded.emit(self.file_b_path, self._workbook_b)
+            if self._workbook_b is None:
+                self._emit_progress(30, "正在加载文件 B...", force=True)
+                self._workbook_b = _load_workbook(
+                    self.file_b_path, read_only, partial(self._on_load_progress, 1)
+                )
+                self.file_loaded.emit(self.file_b_path, self._workbook_b)
+            
+            # 2. 同一文件的副本：任何比较模式下都不会有差异，跳过比较
+            if self._files_identical():
+                self._emit_progress(100, "两个文件内容相同", force=True)
+                self.compare_finished.emit(CompareResult(
+                    file_a=self._workbook_a.file_name,
+                    file_b=self._workbook_b.file_name,
+                    diffs=[],
+                    summary=DiffSummary()
+                ))
+                return
             
             # 3. 执行比较
-            self.progress_updated.emit(50, "正在比较文件...")
-            result = CompareService.compare(
-                self._workbook_a,
-                self._workbook_b,
-                mode=self.mode,
-                options=self.options,
-                selected_sheets=self.selected_sheets
-            )
+            self._start_progress("正在比较文件...")
+            if self.use_smart_match:
+                result = CompareService.compare_with_smart_match(
+                    self._workbook_a,
+                    self._workbook_b,
+                    self.key_cols_a,
+                    self.key_cols_b,
+                    self.header_row,
+                    options=self.options,
+                    selected_sheets=self.selected_sheets,
+                    progress_cb=self._on_compare_progress,
+                    sheet_cache=self.sheet_cache
+                )
+            else:
+                result = CompareService.compare(
+                    self._workbook_a,
+                    self._workbook_b,
+                    mode=self.mode,
+                    options=self.options,
+                    selected_sheets=self.selected_sheets,
+                    progress_cb=self._on_compare_progress
+                )
             
             # 4. 完成
-            self.progress_updated.emit(100, "比较完成")
+            self._emit_progress(100, "比较完成", force=True)
             self.compare_finished.emit(result)
             
+        except _Cancelled:
+            self.compare_cancelled.emit()
         except FileNotFoundError as e:
             self.error_occurred.emit(f"文件不存在: {str(e)}")
         except ValueError as e:
             self.error_occurred.emit(f"文件错误: {str(e)}")
         except Exception as e:
             self.error_occurred.emit(f"发生错误: {str(e)}")
+        finally:
+            # 工作簿已通过 file_loaded 交给主窗口（或本来就由主窗口持有），
+            # 结果发出后即释放，避免线程对象存活期间额外占用两份解析数据
+            self._workbook_a = None
+            self._workbook_b = None
+            self._task = None
+    
+    def _files_identical(self) -> bool:
+        """
+        判断已加载的 A、B 是否来自内容完全相同的文件（常见于复制文件后做的检查）
+        
+        先比较文件大小，大小相同再逐块比较内容；A、B 主键列不同的智能匹配即使文件相同也可能有差异，不做判断。
+        磁盘文件须与工作簿加载时一致，否则工作簿内容不代表当前文件。
+        """
+        if self.use_smart_match and self.key_cols_a != self.key_cols_b:
+            return False
+        if self._workbook_a is self._workbook_b:
+            return True
+        try:
+            if not _workbook_is_current(self._workbook_a, self.file_a_path):
+                return False
+            if not _workbook_is_current(self._workbook_b, self.file_b_path):
+                return False
+            return filecmp.cmp(self.file_a_path, self.file_b_path, shallow=False)
+        except OSError:
+            return False
     
-    @property
-    def workbook_a(self) -> Optional[WorkbookData]:
-        return self._workbook_a
+    def _load_both(self, read_only: bool):
+        """
+        并行加载文件 A 和 B，每个文件加载完成即发送 file_loaded 信号
+        
+        解析时间主要花在 openpyxl 的 XML 解析和文件读取上，两个文件同时加载可缩短等待时间。
+        信号在本线程发送，Qt 会自动排队到接收者所在的线程。
+        """
+        self._emit_progress(10, "正在加载文件...", force=True)
+        # 每次比较最多加载一次文件，新建两个线程的开销相对文件解析可以忽略，使用局部线程池即可；
+        # 退出 with 时两个加载都已结束，本线程对象销毁后不会再被加载线程回调
+        self._load_aborted = False
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            futures = {
+                executor.submit(
+                    _load_workbook, self.file_a_path, read_only, partial(self._on_load_progress, 0)
+                ): 'a',
+                executor.submit(
+                    _load_workbook, self.file_b_path, read_only, partial(self._on_load_progress, 1)
+                ): 'b',
+            }
+            try:
+                for done_count, future in enumerate(as_completed(futures), 1):
+                    workbook = future.result()
+                    if futures[future] == 'a':
+                        self._workbook_a = workbook
+                        self.file_loaded.emit(self.file_a_path, workbook)
+                    else:
+                        self._workbook_b = workbook
+                        self.file_loaded.emit(self.file_b_path, workbook)
+                    self._emit_progress(10 + done_count * 20, f"已加载 {done_count}/2 个文件", force=True)
+            except BaseException:
+                # 一个文件加载失败或取消时让另一个尽快停止，错误不必等它加载完成再报告
+                self._load_aborted = True
+                raise
     
-    @property
-    def workbook_b(self) -> Optional[WorkbookData]:
-        return self._workbook_b
+    def _on_load_progress(self, index: int, percent: int, message: str):
+        """
+        文件加载进度回调（index 0 为文件 A，1 为文件 B），两个文件的进度合并映射到 10-50 区间，并检查是否请求取消
+        
+        并行加载时在加载线程中调用。
+        """
+        if self._load_aborted or self.isInterruptionRequested():
+            raise _Cancelled()
+        self._load_percents[index] = percent
+        self._emit_progress(10 + sum(self._load_percents) * 40 // 200, message)
+    
+    def _start_progress(self, message: str):
+        """进入比较阶段（进度 50%）"""
+        self._emit_progress(50, message, force=True)
+    
+    def _on_compare_progress(self, percent: int, message: str):
+        """比较进度回调（映射到 50-100 区间），并检查是否请求取消"""
+        if self.isInterruptionRequested():
+            raise _Cancelled()
+        self._emit_progress(50 + percent // 2, message)
+    
+    def _emit_progress(self, percent: int, message: str, force: bool = False):
+        """
+        发送进度信号（限频）
+        
+        距上次发送不足 PROGRESS_THROTTLE_MS 的中间进度直接丢弃，后续更新会带上最新进度；
+        阶段切换和完成（force=True）总是发送。
+        """
+        now = time.monotonic_ns()
+        if not force and now - self._last_progress_ns < self.PROGRESS_THROTTLE_MS * 1_000_000:
+            return
+        self._last_progress_ns = now
+        self.progress_updated.emit(percent, message)
 
 
 class FileLoadWorker(QThread):
-    """单文件加载线程"""
+    """单文件加载线程（主窗口打开文件时使用，避免解析大文件时阻塞界面）"""
     
-    loaded = pyqtSignal(str, object)    # 加载完成 (路径, WorkbookData)
-    error = pyqtSignal(str, str)        # 发生错误 (路径, 错误消息)
+    loaded = pyqtSignal(str, object)            # 加载完成 (路径, WorkbookData)
+    error = pyqtSignal(str, str)                # 发生错误 (路径, 错误消息)
+    progress_updated = pyqtSignal(int, str)     # 进度更新 (百分比, 消息)
+    load_cancelled = pyqtSignal()               # 加载已取消
     
-    def __init__(self, file_path: str, parent=None):
+    def __init__(self, file_path: str, parent=None, read_only: bool = False):
         super().__init__(parent)
         self.file_path = file_path
+        self.read_only = read_only  # 只用于内容比较时可只读流式加载（不含样式）
+        self._last_progress_ns = 0
+    
+    def cancel(self):
+        """请求取消（在下一次进度回调时停止，随后发送 load_cancelled）"""
+        self.requestInterruption()
     
     def run(self):
         try:
-            workbook = ExcelService.load_file(self.file_path)
+            workbook = _load_workbook(self.file_path, self.read_only, self._on_progress)
             self.loaded.emit(self.file_path, workbook)
+        except _Cancelled:
+            self.load_cancelled.emit()
         except Exception as e:
             self.error.emit(self.file_path, str(e))
+    
+    def _on_progress(self, percent: int, message: str):
+        """加载进度回调（限频发送），并检查是否请求取消"""
+        if self.isInterruptionRequested():
+            raise _Cancelled()
+        now = time.monotonic_ns()
+        if now - self._last_progress_ns < CompareWorker.PROGRESS_THROTTLE_MS * 1_000_000:
+            return
+        self._last_progress_ns = now
+        self.progress_updated.emit(percent, message)
+
+
+class WarmupWorker(QRunnable):
+    """
+    启动预热任务：在后台线程预先导入首次使用时才加载的模块
+    
+    这些模块在主线程中按需导入（读取 .xls、智能比较、导出报告），
+    提前在后台导入后，首次操作不再承担导入耗时。
+    """
+    
+    # 预先导入的模块（可选依赖缺失时忽略）
+    MODULES = (
+        "xlrd",
+        "src.services.smart_compare_service",
+        "src.services.report_service",
+    )
+    
+    def run(self):
+        for name in self.MODULES:
+            try:
+                importlib.import_module(name)
+            except ImportError:
+                pass
@@ -0,0 +1,174 @@
+"""
+CompareService 的回归测试
+
+行匹配、值标准化和专用比较函数以最直接的实现为基准，在随机输入上比较结果。
+"""
+import itertools
+import random
+import unittest
+
+from src.models.diff_model import DiffType
+from src.models.excel_model import CellData, CellType, SheetData, WorkbookData
+from src.services.compare_service import CompareOptions, CompareService
+
+
+def reference_match(list_a, list_b):
+    """对所有配对按距离稳定排序后贪婪选择（原始实现）"""
+    pairs = []
+    for i, (row_a, _) in enumerate(list_a):
+        for j, (row_b, _) in enumerate(list_b):
+            pairs.append((abs(row_a - row_b), i, j))
+    pairs.sort(key=lambda x: x[0])
+    
+    matches = []
+    used_a = set()
+    used_b = set()
+    for _, i, j in pairs:
+        if i not in used_a and j not in used_b:
+            matches.append((list_a[i], list_b[j]))
+            used_a.add(i)
+            used_b.add(j)
+    unmatched_a = [row for i, row in enumerate(list_a) if i not in used_a]
+    unmatched_b = [row for j, row in enumerate(list_b) if j not in used_b]
+    return matches, unmatched_a, unmatched_b
+
+
+def make_options(ignore_case=False, ignore_whitespace=False, ignore_empty_rows=False):
+    """构造比较选项"""
+    options = CompareOptions()
+    options.ignore_case = ignore_case
+    options.ignore_whitespace = ignore_whitespace
+    options.ignore_empty_rows = ignore_empty_rows
+    return options
+
+
+ALL_OPTIONS = [make_options(*flags) for flags in itertools.product((False, True), repeat=3)]
+
+SAMPLE_VALUES = [
+    None, "", " ", "  ", "a", "A", " a", "a ", " A ", "ab", "AB", "b",
+    0, 1, 1.0, True, False, 2.5, "1", " 1 ",
+]
+
+
+class MatchRowsByDistanceTest(unittest.TestCase):
+    """match_rows_by_distance 与全配对贪婪匹配结果一致"""
+    
+    def assertSameAsReference(self, list_a, list_b):
+        self.assertEqual(
+            CompareService.match_rows_by_distance(list_a, list_b),
+            reference_match(list_a, list_b),
+            f"A={[r for r, _ in list_a]} B={[r for r, _ in list_b]}"
+        )
+    
+    @staticmethod
+    def rows(indices, side):
+        return [(row_idx, f"{side}{row_idx}") for row_idx in sorted(indices)]
+    
+    def test_empty_and_single(self):
+        self.assertSameAsReference([], [])
+        self.assertSameAsReference(self.rows([3], "a"), [])
+        self.assertSameAsReference([], self.rows([3], "b"))
+        self.assertSameAsReference(self.rows([3], "a"), self.rows([7], "b"))
+    
+    def test_tied_distances(self):
+        # A 的一行与 B 的两行距离相同，或两行 A 与同一行 B 距离相同
+        self.assertSameAsReference(self.rows([5], "a"), self.rows([3, 7], "b"))
+        self.assertSameAsReference(self.rows([3, 7], "a"), self.rows([5], "b"))
+        self.assertSameAsReference(self.rows([2, 6], "a"), self.rows([4, 8], "b"))
+        self.assertSameAsReference(self.rows([1, 3, 5, 7], "a"), self.rows([2, 4, 6], "b"))
+        self.assertSameAsReference(self.rows([0, 10], "a"), self.rows([5, 15, 20], "b"))
+    
+    def test_same_row_numbers(self):
+        self.assertSameAsReference(self.rows([1, 2, 3], "a"), self.rows([1, 2, 3], "b"))
+        self.assertSameAsReference(self.rows([1, 2, 3, 9], "a"), self.rows([2, 3], "b"))
+    
+    def test_random_duplicate_keys(self):
+        rng = random.Random(20240101)
+        for _ in range(3000):
+            span = rng.randint(1, 30)
+            n = rng.randint(0, min(span, 8))
+            m = rng.randint(0, min(span, 8))
+            list_a = self.rows(rng.sample(range(span), n), "a")
+            list_b = self.rows(rng.sample(range(span), m), "b")
+            self.assertSameAsReference(list_a, list_b)
+
+
+class NormalizeValuesTest(unittest.TestCase):
+    """normalize_values 标准化后的 != 与 values_differ 判断一致"""
+    
+    def test_matches_values_differ(self):
+        for options in ALL_OPTIONS:
+            for val_a, val_b in itertools.product(SAMPLE_VALUES, repeat=2):
+                norm_a, norm_b = CompareService.normalize_values([val_a, val_b], options)
+                self.assertEqual(
+                    norm_a != norm_b,
+                    CompareService.values_differ(val_a, val_b, options),
+                    f"{val_a!r} vs {val_b!r} with {vars(options)}"
+                )
+    
+    def test_no_options_returns_input(self):
+        values = [" A ", None, 1]
+        self.assertIs(CompareService.normalize_values(values, make_options()), values)
+    
+    def test_does_not_modify_input(self):
+        values = [" A ", "", None]
+        options = make_options(True, True, True)
+        self.assertEqual(CompareService.normalize_values(values, options), ["a", None, None])
+        self.assertEqual(values, [" A ", "", None])
+
+
+class BuildDifferTest(unittest.TestCase):
+    """build_differ 生成的比较函数与 values_differ 判断一致"""
+    
+    def test_matches_values_differ(self):
+        for options in ALL_OPTIONS:
+            differ = CompareService.build_differ(options)
+            for val_a, val_b in itertools.product(SAMPLE_VALUES, repeat=2):
+                self.assertEqual(
+                    differ(val_a, val_b),
+                    CompareService.values_differ(val_a, val_b, options),
+                    f"{val_a!r} vs {val_b!r} with {vars(options)}"
+                )
+
+
+
+def make_workbook(name, rows):
+    """由二维值列表构造只含一个工作表的工作簿"""
+    cells = [
+        [CellData(value=v, cell_type=CellType.EMPTY if v is None else CellType.STRING) for v in row]
+        for row in rows
+    ]
+    sheet = SheetData(name="Sheet1", rows=cells, row_count=len(rows), col_count=max(map(len, rows)))
+    return WorkbookData(file_path=name, file_name=name, sheets=[sheet], sheet_names=["Sheet1"])
+
+
+class SmartMatchKeyColumnsTest(unittest.TestCase):
+    """智能匹配的主键列配置"""
+    
+    def setUp(self):
+        self.workbook_a = make_workbook("a.xlsx", [["id", "v"], ["1", "x"], ["2", "y"]])
+        self.workbook_b = make_workbook("b.xlsx", [["id", "v"], ["1", "x"], ["2", "z"]])
+    
+    def test_key_columns_on_both_sides(self):
+        result = CompareService.compare_with_smart_match(
+            self.workbook_a, self.workbook_b, (0, None), (0, None), header_row=0
+        )
+        self.assertEqual(
+            [(d.row, d.col, d.diff_type, d.old_value, d.new_value) for d in result.diffs],
+            [(2, 1, DiffType.MODIFIED, "y", "z")]
+        )
+    
+    def test_missing_key_column_in_b(self):
+        # 界面上 B 文件主键列无法解析时为 None：B 没有可匹配的主键，A 的行全部视为删除
+        result = CompareService.compare_with_smart_match(
+            self.workbook_a, self.workbook_b, (0, None), (None, None), header_row=0
+        )
+        self.assertEqual(
+            sorted((d.row, d.col, d.diff_type) for d in result.diffs),
+            [(1, 0, DiffType.DELETED), (1, 1, DiffType.DELETED),
+             (2, 0, DiffType.DELETED), (2, 1, DiffType.DELETED)]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
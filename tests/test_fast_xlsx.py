@@ -0,0 +1,258 @@
+"""
+fast_xlsx 快速读取的回归测试
+
+以 openpyxl 只读模式 iter_rows(values_only=True) 的结果为基准，逐个工作表比较读取结果。
+"""
+import datetime
+import os
+import re
+import tempfile
+import unittest
+import zipfile
+
+import openpyxl
+from openpyxl.cell.rich_text import CellRichText, TextBlock
+from openpyxl.cell.text import InlineFont
+from openpyxl.utils.datetime import CALENDAR_MAC_1904
+
+from src.services.excel_service import ExcelService
+from src.services.fast_xlsx import UnsupportedXlsxError, XlsxValueReader
+
+
+def openpyxl_values(path):
+    """openpyxl 只读模式读取的 [(工作表名, 行列表)]"""
+    wb = openpyxl.load_workbook(path, read_only=True, keep_links=False)
+    try:
+        return [(ws.title, [list(row) for row in ws.iter_rows(values_only=True)]) for ws in wb.worksheets]
+    finally:
+        wb.close()
+
+
+def fast_values(path):
+    """XlsxValueReader 读取的 [(工作表名, 行列表)]"""
+    with XlsxValueReader(path) as reader:
+        result = []
+        for name, part in reader.sheets:
+            _rows, cols = reader.sheet_dimension(part)
+            result.append((name, list(reader.iter_rows(part, cols))))
+        return result
+
+
+def rewrite_parts(path, transforms, extra_parts=None):
+    """改写 xlsx 中的部件（用于构造 openpyxl 不会写出的内容）"""
+    with zipfile.ZipFile(path) as zf:
+        members = [(info.filename, zf.read(info.filename)) for info in zf.infolist()]
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name, data in members:
+            if name in transforms:
+                data = transforms[name](data.decode("utf-8")).encode("utf-8")
+            zf.writestr(name, data)
+        for name, text in (extra_parts or {}).items():
+            zf.writestr(name, text.encode("utf-8"))
+
+
+def rewrite_part(path, part, transform):
+    """改写 xlsx 中的一个部件"""
+    rewrite_parts(path, {part: transform})
+
+
+def move_to_shared_strings(path):
+    """
+    把工作表中的内联字符串移入共享字符串表
+    
+    openpyxl 保存时只写内联字符串，Excel 保存的文件则使用共享字符串表。
+    共享字符串原文照搬内联字符串的 XML，x005F_ 转义等内容会原样保留。
+    """
+    strings = []
+    
+    def replace_cell(match):
+        strings.append(match.group(2))
+        return f'{match.group(1)} t="s"><v>{len(strings) - 1}</v></c>'
+    
+    def sheet(xml):
+        return re.sub(r'(<c r="[A-Z]+\d+"(?: s="\d+")?) t="inlineStr"><is>(.*?)</is></c>', replace_cell, xml)
+    
+    def workbook_rels(xml):
+        return xml.replace(
+            "</Relationships>",
+            '<Relationship Id="rIdSST" '
+            'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/sharedStrings" '
+            'Target="sharedStrings.xml"/></Relationships>'
+        )
+    
+    def content_types(xml):
+        return xml.replace(
+            "</Types>",
+            '<Override PartName="/xl/sharedStrings.xml" ContentType='
+            '"application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"/></Types>'
+        )
+    
+    with zipfile.ZipFile(path) as zf:
+        sheet_parts = [name for name in zf.namelist() if name.startswith("xl/worksheets/sheet")]
+    transforms = {name: sheet for name in sheet_parts}
+    rewrite_parts(path, transforms)
+    shared = "".join(f"<si>{item}</si>" for item in strings)
+    rewrite_parts(
+        path,
+        {"xl/_rels/workbook.xml.rels": workbook_rels, "[Content_Types].xml": content_types},
+        {"xl/sharedStrings.xml": (
+            '<sst xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            f'count="{len(strings)}" uniqueCount="{len(strings)}">{shared}</sst>'
+        )}
+    )
+
+
+class FastXlsxReaderTest(unittest.TestCase):
+    """快速读取结果与 openpyxl 一致"""
+    
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._tmp.name, "book.xlsx")
+    
+    def tearDown(self):
+        self._tmp.cleanup()
+    
+    def assertSameAsOpenpyxl(self):
+        expected = openpyxl_values(self.path)
+        self.assertEqual(fast_values(self.path), expected)
+        return expected
+    
+    def test_basic_types_and_gaps(self):
+        wb = openpyxl.Workbook()
+        ws = wb.active
+        ws.title = "数据"
+        ws["A1"] = 1
+        ws["B1"] = 2.5
+        ws["C1"] = "文本"
+        ws["E1"] = True
+        ws["A3"] = "=A1+B1"
+        ws["G7"] = "  spaced  "
+        ws["B6"] = 1e20
+        ws["C6"] = -3
+        wb.create_sheet("Empty")
+        wb.save(self.path)
+        self.assertSameAsOpenpyxl()
+    
+    def test_date_styles(self):
+        wb = openpyxl.Workbook()
+        ws = wb.active
+        ws["A1"] = datetime.datetime(2024, 1, 2, 3, 4, 5)
+        ws["B1"] = datetime.date(2020, 5, 6)
+        ws["C1"] = datetime.time(12, 30)
+        ws["D1"] = datetime.timedelta(hours=30)
+        ws["D1"].number_format = "[h]:mm:ss"
+        ws["E1"] = 45000
+        ws["E1"].number_format = "yyyy/mm/dd"
+        wb.save(self.path)
+        values = self.assertSameAsOpenpyxl()
+        self.assertIsInstance(values[0][1][0][4], datetime.datetime)
+    
+    def test_date1904(self):
+        wb = openpyxl.Workbook()
+        wb.epoch = CALENDAR_MAC_1904
+        ws = wb.active
+        ws["A1"] = datetime.datetime(2024, 1, 2)
+        ws["B1"] = datetime.date(1999, 12, 31)
+        wb.save(self.path)
+        values = self.assertSameAsOpenpyxl()
+        self.assertEqual(values[0][1][0][0], datetime.datetime(2024, 1, 2))
+    
+    def test_shared_formulas(self):
+        wb = openpyxl.Workbook()
+        ws = wb.active
+        for i in range(1, 6):
+            ws.append([i, f"=A{i}*2"])
+        wb.save(self.path)
+        
+        def to_shared(xml):
+            xml = xml.replace("<f>A1*2</f>", '<f t="shared" ref="B1:B5" si="0">A1*2</f>', 1)
+            return re.sub(r"<f>A\d+\*2</f>", '<f t="shared" si="0"/>', xml)
+        
+        rewrite_part(self.path, "xl/worksheets/sheet1.xml", to_shared)
+        values = self.assertSameAsOpenpyxl()
+        self.assertEqual([row[1] for row in values[0][1]], [f"=A{i}*2" for i in range(1, 6)])
+    
+    def test_inline_strings(self):
+        wb = openpyxl.Workbook()
+        ws = wb.active
+        ws["A1"] = "plain"
+        ws["B1"] = CellRichText(["ab", TextBlock(InlineFont(b=True), "cd")])
+        ws["C1"] = " "
+        wb.save(self.path)
+        values = self.assertSameAsOpenpyxl()
+        self.assertEqual(values[0][1][0][:2], ["plain", "abcd"])
+    
+    def test_shared_strings(self):
+        wb = openpyxl.Workbook()
+        ws = wb.active
+        ws.append(["标题", "值"])
+        ws.append(["标题", CellRichText(["ab", TextBlock(InlineFont(b=True), "cd")])])
+        ws["D4"] = "x"
+        wb.create_sheet("第二页")["A1"] = "标题"
+        wb.save(self.path)
+        move_to_shared_strings(self.path)
+        values = self.assertSameAsOpenpyxl()
+        self.assertEqual(values[0][1][1][:2], ["标题", "abcd"])
+    
+    def test_x005f_escapes(self):
+        wb = openpyxl.Workbook()
+        ws = wb.active
+        ws["A1"] = "placeholder"
+        ws["B1"] = "plain"
+        wb.save(self.path)
+        move_to_shared_strings(self.path)
+        rewrite_part(
+            self.path, "xl/sharedStrings.xml",
+            lambda xml: xml.replace("placeholder", "a_x005F_x000D_b")
+        )
+        values = self.assertSameAsOpenpyxl()
+        self.assertEqual(values[0][1][0], ["a_x000D_b", "plain"])
+    
+    def test_array_formula_is_unsupported(self):
+        wb = openpyxl.Workbook()
+        ws = wb.active
+        ws["A1"] = 1
+        ws["B1"] = "=A1*2"
+        wb.save(self.path)
+        rewrite_part(
+            self.path, "xl/worksheets/sheet1.xml",
+            lambda xml: xml.replace("<f>A1*2</f>", '<f t="array" ref="B1">A1*2</f>')
+        )
+        with self.assertRaises(UnsupportedXlsxError):
+            fast_values(self.path)
+        # ExcelService 回退到 openpyxl 只读模式
+        sheets = ExcelService._load_xlsx_values(self.path)
+        self.assertEqual(sheets[0].rows[0][0].value, 1)
+
+
+class FastXlsxFileHandlingTest(unittest.TestCase):
+    """内存映射文件的打开与关闭"""
+    
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._tmp.name, "book.xlsx")
+    
+    def tearDown(self):
+        self._tmp.cleanup()
+    
+    def test_mapping_closed_after_use(self):
+        wb = openpyxl.Workbook()
+        wb.active["A1"] = 1
+        wb.save(self.path)
+        with XlsxValueReader(self.path) as reader:
+            self.assertFalse(reader._map.closed)
+        self.assertTrue(reader._map.closed)
+        self.assertIsNone(reader._zip.fp)
+        # 映射关闭后文件可以被替换（Windows 下未关闭的映射会锁住文件）
+        os.replace(self.path, self.path + ".bak")
+    
+    def test_invalid_files_raise_value_error(self):
+        for content in (b"", b"not a zip file"):
+            with open(self.path, "wb") as f:
+                f.write(content)
+            with self.assertRaises(ValueError):
+                ExcelService.load_file(self.path, read_only=True)
+
+
+if __name__ == "__main__":
+    unittest.main()